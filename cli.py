@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Командная строка Dzen News Scraper
+
+Тяжелые модули (Playwright, aiofiles, планировщик) импортируются внутри
+команд, поэтому легкие операции вроде rss и stats стартуют мгновенно.
+"""
+import argparse
+import sys
+
+
+def cmd_crawl(args) -> int:
+    """Однократный сбор новостей браузером"""
+    import asyncio
+
+    from structured_logging import setup_logging
+    from dzen_scraper import main as dzen_main
+
+    setup_logging("dzen_scraper.log")
+    asyncio.run(dzen_main())
+    return 0
+
+
+def _latest_run_file(output_dir: str):
+    from pathlib import Path
+
+    from storage import recover_partial_runs
+
+    recover_partial_runs(output_dir)
+    runs = sorted(Path(output_dir).glob("dzen_news_*.json"))
+    return runs[-1] if runs else None
+
+
+def _open_db():
+    """База обработанных новостей или None с сообщением, если ее еще нет"""
+    import os
+
+    from config import Config
+    from storage import NewsDatabase
+
+    db = NewsDatabase(os.path.join(Config.OUTPUT_DIR, "news_database.db"))
+    if not db.exists():
+        print(
+            f"База данных не найдена: {db.db_path} (сначала запустите crawl)",
+            file=sys.stderr,
+        )
+        return None
+    return db
+
+
+def _news_from_db(db, limit=None):
+    items = []
+    for row in db.fetch_news(limit=limit):
+        processed_at = (row["processed_at"] or "").replace(" ", "T")
+        items.append(
+            {
+                "id": row["story_id"],
+                "title": row["title"] or "",
+                "url": row["story_url"],
+                "rubric": row["rubric"] or "",
+                "summary": row["text"] or "",
+                "pub_date": f"{processed_at}+00:00" if processed_at else "",
+            }
+        )
+    return items
+
+
+def cmd_rss(args) -> int:
+    """Перестраивает RSS-ленту из последнего JSON запуска или из базы"""
+    import json
+    import os
+    import sqlite3
+
+    from config import Config
+    from rss_feed import generate_rss
+
+    if args.from_db:
+        db = _open_db()
+        if db is None:
+            return 1
+        try:
+            news_items = _news_from_db(db, args.limit)
+        except sqlite3.Error as e:
+            print(f"Не удалось прочитать базу {db.db_path}: {e}", file=sys.stderr)
+            return 1
+        source = "база данных"
+    else:
+        run_file = args.input or _latest_run_file(Config.OUTPUT_DIR)
+        if not run_file:
+            print(f"Нет файлов dzen_news_*.json в {Config.OUTPUT_DIR}", file=sys.stderr)
+            return 1
+        with open(run_file, encoding="utf-8") as f:
+            news_items = json.load(f)
+        source = str(run_file)
+
+    output = args.output or os.path.join(Config.OUTPUT_DIR, "dzen_news_current.rss")
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(generate_rss(news_items))
+    print(f"RSS лента ({len(news_items)} новостей, источник: {source}): {output}")
+    return 0
+
+
+def cmd_export(args) -> int:
+    """Выгружает обработанные новости из базы в JSON или дописывает Parquet"""
+    import json
+    import os
+    import sqlite3
+
+    from config import Config
+
+    if args.format == "parquet":
+        from parquet_export import ParquetExporter
+
+        from storage import recover_partial_runs
+
+        recover_partial_runs(Config.OUTPUT_DIR)
+        exporter = ParquetExporter(Config.OUTPUT_DIR)
+        try:
+            runs = exporter.export_run_files()
+            rows = exporter.export_processed_news(
+                os.path.join(Config.OUTPUT_DIR, "news_database.db")
+            )
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(
+            f"Parquet дописан: {runs} новостей из запусков, {rows} строк из базы "
+            f"({exporter.root})"
+        )
+        return 0
+
+    db = _open_db()
+    if db is None:
+        return 1
+    try:
+        rows = db.fetch_news(rubric=args.rubric, limit=args.limit)
+    except sqlite3.Error as e:
+        print(f"Не удалось прочитать базу {db.db_path}: {e}", file=sys.stderr)
+        return 1
+    payload = json.dumps(rows, ensure_ascii=False, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"Выгружено {len(rows)} новостей: {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+def cmd_stats(args) -> int:
+    """Печатает сводку по базе обработанных новостей"""
+    import json
+    import sqlite3
+
+    db = _open_db()
+    if db is None:
+        return 1
+    try:
+        stats = db.stats()
+    except sqlite3.Error as e:
+        print(f"Не удалось прочитать базу {db.db_path}: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"Всего новостей: {stats['total']}")
+    print(f"Первая: {stats['first_processed_at']}")
+    print(f"Последняя: {stats['last_processed_at']}")
+    print("По рубрикам:")
+    for rubric, count in stats["by_rubric"].items():
+        print(f"  {rubric or '(без рубрики)'}: {count}")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    """Раздает папку с результатами (RSS, JSON) по HTTP"""
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    from config import Config
+
+    handler = partial(SimpleHTTPRequestHandler, directory=Config.OUTPUT_DIR)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(
+        f"Раздача {Config.OUTPUT_DIR} на http://{args.host}:{args.port}/dzen_news_current.rss"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def cmd_soak(args) -> int:
+    """Долгий обход рубрик, сюжетов и статей с замером памяти (бенчмарк)"""
+    import asyncio
+    import csv
+    import logging
+    import os
+    import tempfile
+    import time
+
+    from config import Config
+    from frontier import CrawlFrontier
+    from storage import NewsDatabase
+    from structured_logging import setup_logging
+    from dzen_scraper import DzenRSSNewsScraper
+
+    setup_logging("soak.log")
+    logger = logging.getLogger("soak")
+
+    async def run():
+        scraper = DzenRSSNewsScraper()
+        samples = []
+        started = time.monotonic()
+
+        def sample():
+            samples.append(
+                {
+                    "navigation": scraper.navigations,
+                    "elapsed_s": round(time.monotonic() - started, 1),
+                    **scraper.memory_governor.snapshot(),
+                    "recycles": scraper.memory_governor.recycles,
+                }
+            )
+            logger.info("Замер: %s", samples[-1])
+
+        async def sampler():
+            next_at = 0
+            while True:
+                if scraper.navigations >= next_at:
+                    sample()
+                    next_at = scraper.navigations + args.sample_every
+                await asyncio.sleep(0.2)
+
+        sampling = None
+        # Рабочую базу не трогаем: каждый проход идет с чистой временной,
+        # чтобы сюжеты рубрик обходились заново, а не пропускались как обработанные
+        with tempfile.TemporaryDirectory(prefix="dzen_soak_") as tmp_dir:
+            try:
+                await scraper.init_browser()
+                rubrics = await scraper.get_rubrics()
+                if not rubrics:
+                    logger.error("Не удалось получить рубрики")
+                    return samples
+                sampling = asyncio.create_task(sampler())
+
+                passes = 0
+                while scraper.navigations < args.navigations:
+                    passes += 1
+                    scraper.db = NewsDatabase(
+                        os.path.join(tmp_dir, f"soak_{passes}.db")
+                    )
+                    scraper.db.init()
+                    frontier = CrawlFrontier(
+                        rubric_weights=Config.RUBRIC_WEIGHTS,
+                        max_per_rubric=Config.MAX_STORIES_PER_RUBRIC,
+                    )
+                    await scraper.collect_stories(rubrics, frontier)
+                    await scraper.process_frontier(frontier, len(frontier), [])
+            finally:
+                if sampling:
+                    sampling.cancel()
+                if samples:
+                    sample()
+                await scraper.close_browser()
+        return samples
+
+    samples = asyncio.run(run())
+    if not samples:
+        print("Нет замеров", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+
+    # Сравниваем среднюю память браузера в первой и последней четверти прогона
+    quarter = max(1, len(samples) // 4)
+    head = sum(s["browser_mb"] for s in samples[:quarter]) / quarter
+    tail = sum(s["browser_mb"] for s in samples[-quarter:]) / quarter
+    drift = (tail - head) / head * 100 if head else 0.0
+    print(
+        f"Переходов: {samples[-1]['navigation']}, браузер: начало {head:.0f} МБ, "
+        f"конец {tail:.0f} МБ, дрейф {drift:+.1f}%, "
+        f"пик {max(s['browser_mb'] for s in samples):.0f} МБ, "
+        f"Python: конец {samples[-1]['python_mb']:.0f} МБ"
+    )
+    return 0 if drift <= args.max_drift else 1
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"должно быть положительным, получено {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Dzen News Scraper: сбор новостей и RSS"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl = commands.add_parser("crawl", help="собрать новости браузером")
+    crawl.set_defaults(func=cmd_crawl)
+
+    rss = commands.add_parser("rss", help="перестроить RSS-ленту без браузера")
+    rss.add_argument("--input", help="JSON файл запуска (по умолчанию последний)")
+    rss.add_argument("--from-db", action="store_true", help="строить ленту из базы")
+    rss.add_argument("--limit", type=int, default=100, help="число новостей из базы")
+    rss.add_argument("--output", help="путь к RSS файлу")
+    rss.set_defaults(func=cmd_rss)
+
+    export = commands.add_parser("export", help="выгрузить новости из базы")
+    export.add_argument(
+        "--format",
+        choices=["json", "parquet"],
+        default="json",
+        help="parquet: дописать невыгруженные запуски и базу",
+    )
+    export.add_argument("--rubric", help="только указанная рубрика")
+    export.add_argument("--limit", type=int, help="максимум новостей")
+    export.add_argument("--output", help="файл для выгрузки (по умолчанию stdout)")
+    export.set_defaults(func=cmd_export)
+
+    stats = commands.add_parser("stats", help="сводка по базе")
+    stats.add_argument("--json", action="store_true", help="вывод в JSON")
+    stats.set_defaults(func=cmd_stats)
+
+    serve = commands.add_parser("serve", help="раздавать RSS по HTTP")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.set_defaults(func=cmd_serve)
+
+    soak = commands.add_parser("soak", help="бенчмарк памяти на долгом прогоне")
+    soak.add_argument("--navigations", type=_positive_int, default=300)
+    soak.add_argument(
+        "--sample-every",
+        type=_positive_int,
+        default=10,
+        help="переходов между замерами памяти",
+    )
+    soak.add_argument(
+        "--max-drift",
+        type=float,
+        default=20.0,
+        help="допустимый рост памяти браузера, %%",
+    )
+    soak.add_argument("--output", help="CSV с замерами")
+    soak.set_defaults(func=cmd_soak)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,51 +2,331 @@
 Конфигурация для Dzen News Scraper
 """
 import os
-from dotenv import load_dotenv
+from typing import Dict, List
+
+from dotenv import dotenv_values
+
+# Профили нагрузки: значения по умолчанию, которые можно переопределить явно
+LOAD_PROFILES = {
+    'gentle': {'MIN_DELAY': 3.0, 'MAX_DELAY': 6.0, 'MAX_CONCURRENCY': 1, 'CONTEXT_POOL_SIZE': 2},
+    'normal': {'MIN_DELAY': 1.0, 'MAX_DELAY': 3.0, 'MAX_CONCURRENCY': 2, 'CONTEXT_POOL_SIZE': 3},
+    'aggressive': {'MIN_DELAY': 0.5, 'MAX_DELAY': 2.0, 'MAX_CONCURRENCY': 4, 'CONTEXT_POOL_SIZE': 4},
+}
+
+OUTPUT_FORMATS = ('json', 'rss', 'parquet')
+
+
+class ConfigError(ValueError):
+    """Некорректное значение в конфигурации"""
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on'):
+        return True
+    if lowered in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"ожидается true/false, получено {value!r}")
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, sep, weight = item.rpartition(':')
+        if not sep or not name.strip():
+            raise ValueError(f"ожидается 'Рубрика:вес', получено {item.strip()!r}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def _parse_formats(value: str) -> List[str]:
+    formats = []
+    for item in value.replace(' ', '').lower().split(','):
+        formats.extend(['json', 'rss'] if item == 'both' else [item])
+    return list(dict.fromkeys(f for f in formats if f))
 
-load_dotenv()
 
 class Config:
     # Основные настройки
-    BASE_URL = "https://dzen.ru/news"
-    MAX_ARTICLES = int(os.getenv('MAX_ARTICLES', '30'))
-    SAVE_FORMAT = os.getenv('SAVE_FORMAT', 'json')  # json, markdown, both
-    
+    BASE_URL: str = "https://dzen.ru/news"
+    LOAD_PROFILE: str = 'normal'
+    SAVE_FORMAT: List[str] = ['json', 'rss']  # json, rss, parquet, both
+
+    # Охват обхода
+    MAX_ARTICLES: int = 30  # всего сюжетов за запуск
+    MAX_RUBRICS: int = 1
+    MAX_STORIES_PER_RUBRIC: int = 3
+    MAX_CARDS_PER_RUBRIC: int = 10
+    MAX_DETAIL_ARTICLES: int = 2
+
+    # Приоритет обхода
+    RUN_TIME_BUDGET: int = 0  # секунд на запуск, 0 - без ограничения
+    RUBRIC_WEIGHTS: Dict[str, float] = {'Главное': 1.0}  # остальные рубрики - 0.5
+    FULL_TEXT_RETRY_HOURS: float = 6.0  # сколько часов дообходить сюжеты без полного текста
+    FULL_TEXT_MAX_ATTEMPTS: int = 3  # всего обходов сюжета без полного текста, включая первый
+
+    # Скорость и параллельность
+    MIN_DELAY: float = 1.0  # минимальный интервал между переходами, AIMD не опускается ниже
+    MAX_DELAY: float = 3.0  # начальный интервал между переходами, дальше его ведет AIMD
+    MAX_CONCURRENCY: int = 2  # воркеров обработки сюжетов, не больше CONTEXT_POOL_SIZE
+
     # Настройки браузера
-    HEADLESS = os.getenv('HEADLESS', 'true').lower() == 'true'
-    BROWSER_TIMEOUT = int(os.getenv('BROWSER_TIMEOUT', '30000'))
-    PAGE_TIMEOUT = int(os.getenv('PAGE_TIMEOUT', '20000'))
-    
-    
-    OUTPUT_DIR = os.getenv('OUTPUT_DIR', './output')
-    LOGS_DIR = os.getenv('LOGS_DIR', './logs')
-    
-
-    # User Agents для ротации
+    HEADLESS: bool = True
+    BROWSER_TIMEOUT: int = 70000  # загрузка главной страницы, мс
+    PAGE_TIMEOUT: int = 30000  # загрузка рубрик, сюжетов и статей, мс
+    SELECTOR_TIMEOUT: int = 10000  # ожидание элементов на странице, мс
+
+    # Пул контекстов и ротация отпечатков
+    CONTEXT_POOL_SIZE: int = 3
+    IDENTITY_MAX_BLOCKS: int = 2
+    PROXY_LIST_FILE: str = ''  # файл с прокси, по одному на строку
+
+    # Память долгих запусков
+    PAGE_RECYCLE_NAVIGATIONS: int = 50  # переходов до пересоздания контекста
+    BROWSER_MEMORY_LIMIT_MB: int = 1200  # PSS браузера, после которого пересоздаем все контексты
+
+    OUTPUT_DIR: str = './output'
+    LOGS_DIR: str = './logs'
+
+    # User Agents для ротации: только Chrome под Linux, как запущенный Chromium,
+    # версия Chrome подставляется из браузера (context_pool.build_identities)
     USER_AGENTS = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0"
     ]
-    
-    # Селекторы для парсинга
+
+    # Цепочки селекторов для парсинга: основной селектор первым, затем запасные.
+    # Порядок внутри цепочки меняется по статистике попаданий (selector_engine.py)
     SELECTORS = {
-        'news_cards': 'article[data-testid="news-card"], .news-card, [data-entity="news-card"], .mg-card',
-        'card_title': 'h2, .news-card__title, [data-testid="news-card-title"], .mg-card__title',
-        'card_link': 'a',
-        'card_summary': '.news-card__lead, .news-card__text, .mg-card__text, p',
-        'article_content': 'article, .article-content, .news-content, [data-testid="article-content"], .mg-story-text',
-        'article_text': 'p, .paragraph, .mg-story-text p',
-        'publish_date': 'time, .publish-date, [data-testid="publish-date"], .mg-story-date'
+        'rubric_tabs': [
+            '[data-testid="rubric-tabs-scroll-container"] a',
+            'nav a[href*="/news/rubric/"]',
+            'a[href*="/news/rubric/"]',
+        ],
+        'news_cards': [
+            '[data-testid="other-cards"] [data-testid="card-link"]',
+            '[data-testid="card-link"]',
+            'article[data-testid="news-card"] a[href*="/news/story/"]',
+            '.mg-card a[href*="/news/story/"]',
+            'a[href*="/news/story/"]',
+        ],
+        'card_title': [
+            'p',
+            '.news-site--card-top-avatar__text-SL',
+            'h2',
+            '[data-testid="news-card-title"]',
+            '.mg-card__title',
+        ],
+        'story_title': [
+            '.news-site--StoryHead-desktop__title-1t a',
+            'h1',
+            '.mg-story__title',
+        ],
+        'story_digest': [
+            '[data-testid="story-digest"]',
+            '.mg-story-text',
+        ],
+        'summarization_items': [
+            '[data-testid="summarization-item"]',
+            '[data-testid="story-digest"] li',
+        ],
+        'summary_text': [
+            'span',
+            'p',
+        ],
+        'source_links': [
+            '[data-testid="source-link"]',
+            'a[href*="utm_source"]',
+        ],
+        'story_tail_items': [
+            '.news-story-tail__list-items .news-site--card-text__cardLink-kh',
+            '.news-site--card-text__cardLink-kh',
+            '.news-story-tail__list-items a[href*="dzen.ru/a/"]',
+            'a[href*="dzen.ru/a/"]',
+        ],
+        'article_body': [
+            '[data-testid="article-body"]',
+            '[data-testid="article-content"]',
+            'article',
+            '.article-content',
+        ],
+        'article_paragraphs': [
+            '[data-testid="article-render__block"] p span, '
+            '[data-testid="article-render__block"].content--common-block__block-3U span',
+            '[data-testid="article-render__block"] p',
+            '[data-testid="article-body"] p',
+            'article p',
+        ],
     }
-    
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    # Поля, которых может законно не быть у элемента: не участвуют в алертах
+    SELECTOR_OPTIONAL_FIELDS = ['summary_text', 'source_links', 'story_tail_items']
+    SELECTOR_ALERT_THRESHOLD: float = 0.3  # доля попаданий поля, ниже которой пишем алерт
+
+    LOG_LEVEL: str = 'INFO'
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    
+    LOG_JSON: bool = True  # JSON в файлах логов, консоль всегда текстовая
+    LOG_ROTATION: str = 'size'  # size, time
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_ROTATE_WHEN: str = 'midnight'  # для LOG_ROTATION=time
+    LOG_BACKUP_COUNT: int = 5
+    LOG_SAMPLE_RATE: int = 10  # из частых сообщений уровня элемента пишем 1 из N
+
+    # Настройки, читаемые из окружения: имя -> функция разбора
+    _ENV_FIELDS = {
+        'LOAD_PROFILE': str,
+        'SAVE_FORMAT': _parse_formats,
+        'MAX_ARTICLES': int,
+        'MAX_RUBRICS': int,
+        'MAX_STORIES_PER_RUBRIC': int,
+        'MAX_CARDS_PER_RUBRIC': int,
+        'MAX_DETAIL_ARTICLES': int,
+        'RUN_TIME_BUDGET': int,
+        'RUBRIC_WEIGHTS': _parse_weights,
+        'FULL_TEXT_RETRY_HOURS': float,
+        'FULL_TEXT_MAX_ATTEMPTS': int,
+        'MIN_DELAY': float,
+        'MAX_DELAY': float,
+        'MAX_CONCURRENCY': int,
+        'HEADLESS': _parse_bool,
+        'BROWSER_TIMEOUT': int,
+        'PAGE_TIMEOUT': int,
+        'SELECTOR_TIMEOUT': int,
+        'SELECTOR_ALERT_THRESHOLD': float,
+        'CONTEXT_POOL_SIZE': int,
+        'IDENTITY_MAX_BLOCKS': int,
+        'PROXY_LIST_FILE': str,
+        'PAGE_RECYCLE_NAVIGATIONS': int,
+        'BROWSER_MEMORY_LIMIT_MB': int,
+        'OUTPUT_DIR': str,
+        'LOGS_DIR': str,
+        'LOG_LEVEL': str,
+        'LOG_JSON': _parse_bool,
+        'LOG_ROTATION': str,
+        'LOG_MAX_BYTES': int,
+        'LOG_ROTATE_WHEN': str,
+        'LOG_BACKUP_COUNT': int,
+        'LOG_SAMPLE_RATE': int,
+    }
+    _DEFAULTS: Dict = {}
+
+    @classmethod
+    def _read_env(cls) -> Dict[str, str]:
+        # Приоритет: .env < окружение процесса < файл CONFIG_OVERRIDES_FILE.
+        # Окружение процесса (и environment в docker-compose) не меняется до
+        # перезапуска, поэтому настройки, которые нужно менять на ходу,
+        # задаются в подключенном файле, перекрывающем окружение
+        env = {k: v for k, v in dotenv_values().items() if v is not None}
+        env.update(os.environ)
+        overrides = env.get('CONFIG_OVERRIDES_FILE', '')
+        if overrides and os.path.isfile(overrides):
+            env.update(
+                {k: v for k, v in dotenv_values(overrides).items() if v is not None}
+            )
+        return env
+
+    @classmethod
+    def _build(cls) -> Dict:
+        """Собирает и проверяет значения настроек, не меняя текущие"""
+        if not cls._DEFAULTS:
+            cls._DEFAULTS = {name: getattr(cls, name) for name in cls._ENV_FIELDS}
+
+        env = cls._read_env()
+        errors = []
+
+        profile = env.get('LOAD_PROFILE', cls._DEFAULTS['LOAD_PROFILE']).strip().lower()
+        if profile not in LOAD_PROFILES:
+            errors.append(
+                f"LOAD_PROFILE: неизвестный профиль {profile!r}, "
+                f"допустимы {', '.join(LOAD_PROFILES)}"
+            )
+            profile = cls._DEFAULTS['LOAD_PROFILE']
+
+        values = dict(cls._DEFAULTS)
+        values.update(LOAD_PROFILES[profile])
+        for name, parse in cls._ENV_FIELDS.items():
+            if name not in env or name == 'LOAD_PROFILE':
+                continue
+            try:
+                values[name] = parse(env[name])
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+        values['LOAD_PROFILE'] = profile
+        values['LOG_LEVEL'] = values['LOG_LEVEL'].upper()
+
+        errors.extend(cls._validate(values))
+        if errors:
+            raise ConfigError("Некорректная конфигурация:\n  " + "\n  ".join(errors))
+        return values
+
+    @staticmethod
+    def _validate(values: Dict) -> List[str]:
+        errors = []
+        for name in ('MAX_ARTICLES', 'MAX_RUBRICS', 'MAX_STORIES_PER_RUBRIC',
+                     'MAX_CARDS_PER_RUBRIC', 'FULL_TEXT_MAX_ATTEMPTS',
+                     'MAX_CONCURRENCY', 'CONTEXT_POOL_SIZE', 'IDENTITY_MAX_BLOCKS',
+                     'BROWSER_TIMEOUT', 'PAGE_TIMEOUT', 'SELECTOR_TIMEOUT',
+                     'PAGE_RECYCLE_NAVIGATIONS',
+                     'BROWSER_MEMORY_LIMIT_MB', 'LOG_MAX_BYTES', 'LOG_SAMPLE_RATE'):
+            if values[name] < 1:
+                errors.append(f"{name}: должно быть положительным, получено {values[name]}")
+        if not 0 <= values['SELECTOR_ALERT_THRESHOLD'] <= 1:
+            errors.append("SELECTOR_ALERT_THRESHOLD: должно быть от 0 до 1")
+        if values['RUN_TIME_BUDGET'] < 0:
+            errors.append("RUN_TIME_BUDGET: не может быть отрицательным")
+        if values['FULL_TEXT_RETRY_HOURS'] < 0:
+            errors.append("FULL_TEXT_RETRY_HOURS: не может быть отрицательным")
+        if values['MAX_DETAIL_ARTICLES'] < 0:
+            errors.append("MAX_DETAIL_ARTICLES: не может быть отрицательным")
+        if values['MAX_CONCURRENCY'] > values['CONTEXT_POOL_SIZE']:
+            errors.append(
+                "MAX_CONCURRENCY: каждому воркеру нужен свой контекст, "
+                f"должно быть не больше CONTEXT_POOL_SIZE ({values['CONTEXT_POOL_SIZE']})"
+            )
+        if values['MIN_DELAY'] < 0 or values['MAX_DELAY'] < values['MIN_DELAY']:
+            errors.append("MIN_DELAY/MAX_DELAY: нужно 0 <= MIN_DELAY <= MAX_DELAY")
+        unknown = [f for f in values['SAVE_FORMAT'] if f not in OUTPUT_FORMATS]
+        if unknown or not values['SAVE_FORMAT']:
+            errors.append(
+                f"SAVE_FORMAT: допустимы {', '.join(OUTPUT_FORMATS)} или both, "
+                f"получено {','.join(values['SAVE_FORMAT']) or 'пусто'}"
+            )
+        if values['LOG_ROTATION'] not in ('size', 'time'):
+            errors.append(f"LOG_ROTATION: допустимы size или time, получено {values['LOG_ROTATION']}")
+        if values['LOG_BACKUP_COUNT'] < 0:
+            errors.append("LOG_BACKUP_COUNT: не может быть отрицательным")
+        if values['LOG_LEVEL'] not in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'):
+            errors.append(f"LOG_LEVEL: неизвестный уровень {values['LOG_LEVEL']}")
+        return errors
+
+    @classmethod
+    def load(cls):
+        """Загружает настройки из .env, окружения и CONFIG_OVERRIDES_FILE с проверкой"""
+        for name, value in cls._build().items():
+            setattr(cls, name, value)
+
+    @classmethod
+    def reload(cls) -> Dict:
+        """
+        Перечитывает настройки без перезапуска процесса.
+
+        При ошибке проверки текущие значения сохраняются и выбрасывается
+        ConfigError. Возвращает изменившиеся настройки.
+        """
+        values = cls._build()
+        changed = {
+            name: value for name, value in values.items()
+            if getattr(cls, name) != value
+        }
+        for name, value in changed.items():
+            setattr(cls, name, value)
+        return changed
+
     @classmethod
     def create_directories(cls):
         """Создание необходимых директорий"""
         os.makedirs(cls.OUTPUT_DIR, exist_ok=True)
-        os.makedirs(cls.LOGS_DIR, exist_ok=True)
\ No newline at end of file
+        os.makedirs(cls.LOGS_DIR, exist_ok=True)
+
+
+Config.load()
@@ -1,155 +1,102 @@
 import asyncio
 import json
 import logging
-import random
+import os
 import re
-import xml.etree.ElementTree as ET
+import time
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import hashlib
-import sqlite3
-from urllib.parse import urlparse
 
-from playwright.async_api import async_playwright
-import aiofiles
-
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("logs/dzen_scraper.log"), logging.StreamHandler()],
+from config import Config
+from structured_logging import new_run_id, setup_logging, story_id_var
+from context_pool import ContextPool, build_identities, load_proxies
+from frontier import CrawlFrontier
+from memory_governor import MemoryGovernor
+from parquet_export import ParquetExporter
+from rate_limiter import AdaptiveRateLimiter, BlockDetectedError, is_challenge_page
+from rss_feed import generate_rss
+from selector_engine import SelectorEngine
+from storage import (
+    ARTICLE_SEPARATOR,
+    FULL_TEXTS_HEADER,
+    NewsDatabase,
+    clean_story_url,
+    recover_partial_runs,
 )
+
 logger = logging.getLogger(__name__)
 
 
 class DzenRSSNewsScraper:
     def __init__(self):
-        self.base_url = "https://dzen.ru/news"
+        self.base_url = Config.BASE_URL
         self.browser = None
         self.page = None
+        self.context_pool = None
+        self.lease = None
         self.collected_news = []
-        self.db_path = "output/news_database.db"
-
-        # Создаем директории если их нет
-        Path("output").mkdir(exist_ok=True)
-        Path("logs").mkdir(exist_ok=True)
-
-        self.init_database()
-
-        self.selectors = {
-            "rubric_tabs": '[data-testid="rubric-tabs-scroll-container"] a',
-            "news_cards": '[data-testid="other-cards"] [data-testid="card-link"]',
-            "story_title": ".news-site--StoryHead-desktop__title-1t a, h1",
-            "story_digest": '[data-testid="story-digest"]',
-            "summarization_items": '[data-testid="summarization-item"]',
-            "source_links": '[data-testid="source-link"]',
-            "story_tail_items": ".news-story-tail__list-items .news-site--card-text__cardLink-kh",
-            "article_body": '[data-testid="article-body"]',
-            "article_paragraphs": '[data-testid="article-render__block"] p, [data-testid="article-render__block"] span',
-        }
+        self.partial_file = None
+        self.navigations = 0  # переходов за время жизни скрапера
+        self.memory_governor = MemoryGovernor(
+            max_navigations=Config.PAGE_RECYCLE_NAVIGATIONS,
+            browser_limit_mb=Config.BROWSER_MEMORY_LIMIT_MB,
+        )
+        self.db_path = os.path.join(Config.OUTPUT_DIR, "news_database.db")
+        self.db = NewsDatabase(self.db_path)
+        self.rate_limiter = AdaptiveRateLimiter(
+            min_delay=Config.MIN_DELAY,
+            initial_delay=Config.MAX_DELAY,
+            max_concurrency=Config.MAX_CONCURRENCY,
+        )
+
+        self.selector_engine = SelectorEngine(
+            Config.SELECTORS,
+            stats_path=os.path.join(Config.OUTPUT_DIR, "selector_stats.json"),
+            alert_threshold=Config.SELECTOR_ALERT_THRESHOLD,
+            optional_fields=Config.SELECTOR_OPTIONAL_FIELDS,
+        )
 
     def init_database(self):
         """Инициализирует SQLite базу данных"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Создаем таблицу для уникальных новостей
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS processed_news (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    story_url TEXT UNIQUE NOT NULL,
-                    story_id TEXT NOT NULL,
-                    title TEXT,
-                    rubric TEXT,
-                    text TEXT,
-                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_story_url ON processed_news(story_url)
-            """)
-
-            conn.commit()
-            conn.close()
-            logger.info(f"База данных инициализирована: {self.db_path}")
-
-        except Exception as e:
-            logger.error(f"Ошибка при инициализации базы данных: {e}")
+        self.db.init()
 
     def clean_story_url(self, url: str) -> str:
         """Очищает URL от лишних параметров, оставляя только базовую часть"""
-        try:
-            parsed = urlparse(url)
-
-            path_parts = parsed.path.split("/")
-            if "story" in path_parts:
-                story_index = path_parts.index("story")
-                if len(path_parts) > story_index + 1:
-                    story_id = path_parts[story_index + 1]
-                    clean_url = f"https://dzen.ru/news/story/{story_id}"
-                    return clean_url
-
-            return url
-
-        except Exception as e:
-            logger.warning(f"Ошибка при очистке URL {url}: {e}")
-            return url
-
-    def is_story_processed(self, story_url: str) -> bool:
-        """Проверяет, была ли уже обработана новость с данным URL"""
-        try:
-            clean_url = self.clean_story_url(story_url)
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT COUNT(*) FROM processed_news WHERE story_url = ?", (clean_url,)
-            )
-            count = cursor.fetchone()[0]
-
-            conn.close()
-
-            return count > 0
-
-        except Exception as e:
-            logger.error(f"Ошибка при проверке URL в базе данных: {e}")
-            return False
+        return clean_story_url(url)
 
     def mark_story_processed(
-        self, story_url: str, story_id: str, title: str, rubric: str, text: str = ""
+        self,
+        story_url: str,
+        story_id: str,
+        title: str,
+        rubric: str,
+        text: str = "",
+        detail_links: Optional[int] = None,
     ):
         """Отмечает новость как обработанную в базе данных"""
-        try:
-            clean_url = self.clean_story_url(story_url)
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                INSERT OR IGNORE INTO processed_news (story_url, story_id, title, rubric, text)
-                VALUES (?, ?, ?, ?, ?)
-            """,
-                (clean_url, story_id, title, rubric, text),
-            )
+        self.db.mark_processed(story_url, story_id, title, rubric, text, detail_links)
 
-            conn.commit()
-            conn.close()
-
-            logger.debug(f"Новость отмечена как обработанная: {clean_url}")
-
-        except Exception as e:
-            logger.error(f"Ошибка при сохранении в базу данных: {e}")
+    def _should_retry_full_text(self, state: Dict, first_seen: datetime) -> bool:
+        """Стоит ли еще раз обойти сюжет, сохраненный без полного текста"""
+        if state["has_text"] or Config.MAX_DETAIL_ARTICLES == 0:
+            return False
+        # Страница сюжета загрузилась, но ссылок на статьи на ней не было
+        if state["detail_links"] == 0:
+            return False
+        if state["text_attempts"] >= Config.FULL_TEXT_MAX_ATTEMPTS:
+            return False
+        age_hours = (datetime.now(timezone.utc) - first_seen).total_seconds() / 3600
+        return age_hours <= Config.FULL_TEXT_RETRY_HOURS
 
     async def init_browser(self):
         """Инициализация браузера с настройками"""
+        # Playwright тяжелый, импортируем только когда действительно нужен браузер
+        from playwright.async_api import async_playwright
+
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
-            headless=False,
+            headless=Config.HEADLESS,
             args=[
                 "--no-sandbox",
                 "--disable-setuid-sandbox",
@@ -163,36 +110,119 @@ class DzenRSSNewsScraper:
             ],
         )
 
-        context = await self.browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        identities = build_identities(
+            Config.USER_AGENTS,
+            load_proxies(Config.PROXY_LIST_FILE),
+            browser_version=self.browser.version,
         )
-
-        self.page = await context.new_page()
-        await self.page.set_extra_http_headers(
-            {
-                "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            }
+        self.context_pool = ContextPool(
+            self.browser,
+            identities,
+            size=Config.CONTEXT_POOL_SIZE,
+            max_blocks=Config.IDENTITY_MAX_BLOCKS,
         )
+        await self.context_pool.start()
+
+        self.lease = await self.context_pool.acquire()
+        self.page = self.lease.page
 
         logger.info("Браузер инициализирован успешно")
 
+    async def _release_lease(self, lease):
+        """Возвращает контекст в пул и пересоздает отработавшие свое контексты"""
+        if await self.context_pool.release(lease):
+            self.memory_governor.record_recycle(
+                "отложенное пересоздание по памяти после возврата в пул"
+            )
+        await self._recycle_contexts()
+
+    async def _recycle_contexts(self):
+        """Пересоздает контексты, отработавшие свое или раздувшие память"""
+        # Пересоздаем контексты, пока память рендереров не доросла до лимита контейнера.
+        # Занятые воркерами контексты пул пересоздаст, когда их вернут
+        if self.memory_governor.over_limit():
+            count = await self.context_pool.recycle_all()
+            self.memory_governor.record_recycle(
+                f"браузер больше {Config.BROWSER_MEMORY_LIMIT_MB} МБ, "
+                f"остальные {len(self.context_pool.leases) - count} при возврате в пул",
+                count,
+                full=True,
+            )
+        else:
+            count = await self.context_pool.recycle_idle(
+                lambda lease: self.memory_governor.should_recycle(lease.navigations)
+            )
+            if count:
+                self.memory_governor.record_recycle(
+                    f"{Config.PAGE_RECYCLE_NAVIGATIONS} переходов", count
+                )
+
+    async def _goto(
+        self,
+        url: str,
+        wait_until: str = "domcontentloaded",
+        timeout: int = None,
+        lease=None,
+    ):
+        """Переход на страницу через адаптивный ограничитель с детекцией блокировок"""
+        lease = lease or self.lease
+        page = lease.page
+        timeout = timeout or Config.PAGE_TIMEOUT
+        # Слот хоста освобождается и при отмене во время ожидания очереди
+        async with self.rate_limiter.slot(url):
+            self.navigations += 1
+            lease.navigations += 1
+            lease.identity.requests += 1
+            started = time.monotonic()
+            status = None
+            try:
+                response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+                status = response.status if response else None
+
+                page_text = ""
+                try:
+                    page_text = await page.evaluate(
+                        "() => document.title + ' ' + "
+                        "(document.body ? document.body.innerText.slice(0, 2000) : '')"
+                    )
+                except Exception:
+                    pass
+
+                blocked = is_challenge_page(status, page.url, page_text)
+                self.rate_limiter.record(
+                    url, time.monotonic() - started, status, blocked=blocked
+                )
+                if blocked:
+                    lease.blocked = True
+                    raise BlockDetectedError(
+                        f"Блокировка или капча при загрузке {url} (статус {status})"
+                    )
+                return response
+
+            except BlockDetectedError:
+                raise
+            except Exception:
+                self.rate_limiter.record(url, time.monotonic() - started, status)
+                raise
+
     async def get_rubrics(self) -> List[Dict[str, str]]:
         """Получает список всех рубрик с главной страницы"""
         try:
-            logger.info(f"Переход на главную страницу: {self.base_url}")
-            await self.page.goto(self.base_url, wait_until="networkidle", timeout=70000)
+            logger.info("Переход на главную страницу: %s", self.base_url)
+            await self._goto(
+                self.base_url, wait_until="networkidle", timeout=Config.BROWSER_TIMEOUT
+            )
             await self.page.wait_for_timeout(3000)
 
             # Ждем загрузки вкладок рубрик
-            await self.page.wait_for_selector(
-                self.selectors["rubric_tabs"], timeout=10000
+            await self.selector_engine.wait_for(
+                self.page, "rubric_tabs", Config.SELECTOR_TIMEOUT
             )
 
             rubrics = []
-            rubric_elements = await self.page.query_selector_all(
-                self.selectors["rubric_tabs"]
+            # Исход поиска уже учтен ожиданием выше
+            rubric_elements = await self.selector_engine.query_all(
+                self.page, "rubric_tabs", record=False
             )
 
             for element in rubric_elements:
@@ -208,14 +238,19 @@ class DzenRSSNewsScraper:
                         }
                     )
 
-            logger.info(f"Найдено рубрик: {len(rubrics)}")
+            logger.info("Найдено рубрик: %s", len(rubrics))
             for rubric in rubrics:
-                logger.info(f"  - {rubric['name']}: {rubric['url']}")
+                logger.info(
+                    "  - %s: %s",
+                    rubric["name"],
+                    rubric["url"],
+                    extra={"sample": "rubric"},
+                )
 
             return rubrics
 
         except Exception as e:
-            logger.error(f"Ошибка при получении рубрик: {e}")
+            logger.error("Ошибка при получении рубрик: %s", e)
             return []
 
     def _generate_slug(self, text: str) -> str:
@@ -227,34 +262,32 @@ class DzenRSSNewsScraper:
     ) -> List[Dict[str, str]]:
         """Получает список сюжетов из рубрики"""
         try:
-            logger.info(f"Сбор новостей из рубрики: {rubric['name']}")
-            await self.page.goto(rubric["url"], wait_until="networkidle", timeout=30000)
+            logger.info("Сбор новостей из рубрики: %s", rubric["name"])
+            await self._goto(rubric["url"], wait_until="networkidle")
             await self.page.wait_for_timeout(2000)
 
             stories = []
 
             # Ждем загрузки карточек новостей
-            try:
-                await self.page.wait_for_selector(
-                    self.selectors["news_cards"], timeout=10000
-                )
-            except Exception:
+            if not await self.selector_engine.wait_for(
+                self.page, "news_cards", Config.SELECTOR_TIMEOUT
+            ):
                 logger.warning(
-                    f"Карточки новостей не найдены в рубрике {rubric['name']}"
+                    "Карточки новостей не найдены в рубрике %s", rubric["name"]
                 )
                 return stories
 
-            story_elements = await self.page.query_selector_all(
-                self.selectors["news_cards"]
+            story_elements = await self.selector_engine.query_all(
+                self.page, "news_cards", record=False
             )
 
-            for element in story_elements[
-                :10
-            ]:  # Ограничиваем до 10 новостей на рубрику
+            for position, element in enumerate(
+                story_elements[: Config.MAX_CARDS_PER_RUBRIC]
+            ):  # Ограничиваем число карточек на рубрику
                 try:
                     href = await element.get_attribute("href")
-                    title_element = await element.query_selector(
-                        "p, .news-site--card-top-avatar__text-SL"
+                    title_element = await self.selector_engine.query(
+                        element, "card_title"
                     )
                     title = (
                         await title_element.inner_text()
@@ -263,9 +296,18 @@ class DzenRSSNewsScraper:
                     )
 
                     if href and title:
+                        first_seen = self.db.record_sighting(href)
+
                         # Проверяем, не обрабатывали ли мы уже эту новость
-                        if self.is_story_processed(href):
-                            logger.info(f"Новость уже обработана, пропускаем: {title}")
+                        state = self.db.processed_state(href)
+                        if state is not None and not self._should_retry_full_text(
+                            state, first_seen
+                        ):
+                            logger.info(
+                                "Новость уже обработана, пропускаем: %s",
+                                title,
+                                extra={"sample": "already_processed"},
+                            )
                             continue
 
                         story_id = self._extract_story_id(href)
@@ -276,84 +318,106 @@ class DzenRSSNewsScraper:
                                 "url": href,
                                 "rubric": rubric["name"],
                                 "rubric_slug": rubric["slug"],
+                                "position": position,
+                                "first_seen": first_seen,
+                                "is_new": state is None,
                             }
                         )
 
                 except Exception as e:
-                    logger.warning(f"Ошибка при обработке элемента: {e}")
+                    logger.warning("Ошибка при обработке элемента: %s", e)
                     continue
 
-            logger.info(f"Собрано {len(stories)} новостей из рубрики {rubric['name']}")
+            logger.info(
+                "Собрано %s новостей из рубрики %s", len(stories), rubric["name"]
+            )
             return stories
 
         except Exception as e:
-            logger.error(f"Ошибка при сборе новостей из рубрики {rubric['name']}: {e}")
+            logger.error(
+                "Ошибка при сборе новостей из рубрики %s: %s", rubric["name"], e
+            )
             return []
 
-    async def get_article_full_texts(self, story_url: str) -> List[str]:
-        """Получает полные тексты статей со страницы сюжета"""
+    async def get_article_full_texts(
+        self, story_url: str, lease=None
+    ) -> Tuple[List[str], Optional[int]]:
+        """
+        Получает полные тексты статей со страницы сюжета.
+
+        Возвращает тексты и число найденных ссылок на статьи
+        (None, если ссылки не удалось получить).
+        """
+        lease = lease or self.lease
         article_texts = []
+        links_found = None
 
         try:
             logger.info("Поиск детальных статей для сюжета")
 
             try:
-                detail_links = await self.page.query_selector_all(
-                    self.selectors["story_tail_items"]
+                detail_links = await self.selector_engine.query_all(
+                    lease.page, "story_tail_items"
                 )
 
-                if not detail_links:
-                    detail_links = await self.page.query_selector_all(
-                        ".news-site--card-text__cardLink-kh"
-                    )
+                links_found = len(detail_links)
+                logger.info("Найдено %s ссылок на детальные статьи", links_found)
 
-                logger.info(f"Найдено {len(detail_links)} ссылок на детальные статьи")
-
-                for i, link in enumerate(detail_links[:2]):
+                for i, link in enumerate(detail_links[: Config.MAX_DETAIL_ARTICLES]):
                     try:
                         href = await link.get_attribute("href")
                         if href and "dzen.ru/a/" in href:
                             logger.info(
-                                f"Получение полного текста статьи {i+1}: {href}"
+                                "Получение полного текста статьи %s: %s",
+                                i + 1,
+                                href,
+                                extra={"sample": "article_fetch"},
                             )
 
-                            await self.page.goto(
-                                href, wait_until="domcontentloaded", timeout=30000
+                            await self._goto(
+                                href, wait_until="domcontentloaded", lease=lease
                             )
-                            await self.page.wait_for_timeout(2000)
+                            await lease.page.wait_for_timeout(2000)
 
-                            article_text = await self._extract_article_text()
+                            article_text = await self._extract_article_text(lease.page)
                             if article_text:
                                 article_texts.append(article_text)
                                 logger.info(
-                                    f"Получен текст статьи {i+1} ({len(article_text)} символов)"
+                                    "Получен текст статьи %s (%s символов)",
+                                    i + 1,
+                                    len(article_text),
+                                    extra={"sample": "article_text"},
                                 )
 
-                            await asyncio.sleep(random.uniform(1, 2))
-
+                    except BlockDetectedError as e:
+                        logger.warning("Сбор полных текстов прерван: %s", e)
+                        break
                     except Exception as e:
-                        logger.warning(f"Ошибка при получении статьи {i+1}: {e}")
+                        logger.warning("Ошибка при получении статьи %s: %s", i + 1, e)
                         continue
 
             except Exception as e:
-                logger.warning(f"Не удалось найти ссылки на детальные статьи: {e}")
+                logger.warning("Не удалось найти ссылки на детальные статьи: %s", e)
 
         except Exception as e:
-            logger.error(f"Ошибка при получении полных текстов: {e}")
+            logger.error("Ошибка при получении полных текстов: %s", e)
 
-        return article_texts
+        return article_texts, links_found
 
-    async def _extract_article_text(self) -> str:
+    async def _extract_article_text(self, page=None) -> str:
         """Извлекает текст статьи со страницы"""
+        page = page or self.page
         try:
-            await self.page.wait_for_selector(
-                '[data-testid="article-body"]', timeout=10000
-            )
+            if not await self.selector_engine.wait_for(
+                page, "article_body", Config.SELECTOR_TIMEOUT
+            ):
+                logger.warning("Тело статьи не найдено")
+                return ""
 
             paragraphs = []
 
-            text_elements = await self.page.query_selector_all(
-                '[data-testid="article-render__block"] p span, [data-testid="article-render__block"].content--common-block__block-3U span'
+            text_elements = await self.selector_engine.query_all(
+                page, "article_paragraphs"
             )
 
             for element in text_elements:
@@ -374,7 +438,7 @@ class DzenRSSNewsScraper:
             return full_text
 
         except Exception as e:
-            logger.warning(f"Ошибка при извлечении текста статьи: {e}")
+            logger.warning("Ошибка при извлечении текста статьи: %s", e)
             return ""
 
     def _extract_story_id(self, url: str) -> str:
@@ -384,38 +448,57 @@ class DzenRSSNewsScraper:
             return match.group(1)
         return hashlib.md5(url.encode()).hexdigest()[:16]
 
-    async def get_story_content(self, story: Dict[str, str]) -> Dict[str, str]:
+    async def get_story_content(
+        self, story: Dict[str, str], lease=None
+    ) -> Dict[str, str]:
         """Получает саммари сюжета со страницы Dzen"""
+        lease = lease or self.lease
+        page = lease.page
         try:
-            logger.info(f"Сбор контента для: {story['title']}")
+            logger.info("Сбор контента для: %s", story["title"])
 
             # Используем более быструю стратегию загрузки
             try:
-                await self.page.goto(
-                    story["url"], wait_until="domcontentloaded", timeout=30000
+                await self._goto(
+                    story["url"], wait_until="domcontentloaded", lease=lease
                 )
-                await self.page.wait_for_timeout(1000)
-
-                # Пробуем дождаться основного контента
-                try:
-                    await self.page.wait_for_selector(
-                        self.selectors["story_digest"], timeout=5000
-                    )
-                except Exception:
-                    # Если не дождались, попробуем еще раз с другим селектором
-                    try:
-                        await self.page.wait_for_selector("h1", timeout=3000)
-                    except Exception:
+                await page.wait_for_timeout(1000)
+
+                # Пробуем дождаться основного контента (только проверка готовности:
+                # дайджест и заголовок учитываются в статистике при выборке ниже)
+                if not await self.selector_engine.wait_for(
+                    page, "story_digest", 5000, record=False
+                ):
+                    # Если не дождались, попробуем еще раз с заголовком сюжета
+                    if not await self.selector_engine.wait_for(
+                        page, "story_title", 3000, record=False
+                    ):
                         logger.warning(
-                            f"Контент не полностью загрузился для {story['title']}"
+                            "Контент не полностью загрузился для %s", story["title"]
                         )
 
             except Exception as e:
-                logger.warning(f"Проблемы с загрузкой страницы {story['title']}: {e}")
+                logger.warning(
+                    "Проблемы с загрузкой страницы %s: %s", story["title"], e
+                )
                 # Попробуем продолжить работу с частично загруженной страницей
                 # Если страница вообще не загрузилась, вернем базовую информацию
+                if isinstance(e, BlockDetectedError):
+                    logger.error(
+                        "Блокировка при загрузке %s, пропускаем", story["title"]
+                    )
+                    return {
+                        "id": story["id"],
+                        "title": story["title"],
+                        "url": story["url"],
+                        "rubric": story["rubric"],
+                        "rubric_slug": story["rubric_slug"],
+                        "summary": "Контент недоступен (блокировка)",
+                        "pub_date": datetime.now(timezone.utc).isoformat(),
+                        "scraped_at": datetime.now().isoformat(),
+                    }
                 if "Timeout" in str(e):
-                    logger.error(f"Timeout при загрузке {story['title']}, пропускаем")
+                    logger.error("Timeout при загрузке %s, пропускаем", story["title"])
                     return {
                         "id": story["id"],
                         "title": story["title"],
@@ -430,37 +513,34 @@ class DzenRSSNewsScraper:
             # Получаем заголовок
             title = story["title"]
             try:
-                title_element = await self.page.query_selector(
-                    self.selectors["story_title"]
-                )
+                title_element = await self.selector_engine.query(page, "story_title")
                 if title_element:
                     title = await title_element.inner_text()
                     title = title.strip()
             except Exception as e:
-                logger.warning(f"Не удалось получить заголовок: {e}")
+                logger.warning("Не удалось получить заголовок: %s", e)
 
             summary_parts = []
             source_names = []
 
             try:
-                await self.page.wait_for_selector(
-                    self.selectors["story_digest"], timeout=10000
-                )
-                summary_items = await self.page.query_selector_all(
-                    self.selectors["summarization_items"]
+                if not await self.selector_engine.wait_for(
+                    page, "story_digest", Config.SELECTOR_TIMEOUT
+                ):
+                    raise TimeoutError("дайджест сюжета не найден")
+                summary_items = await self.selector_engine.query_all(
+                    page, "summarization_items"
                 )
 
                 for item in summary_items:
                     # Получаем текст саммари
-                    text_span = await item.query_selector("span")
+                    text_span = await self.selector_engine.query(item, "summary_text")
                     if text_span:
                         text = await text_span.inner_text()
                         summary_parts.append(text.strip())
 
                     # Получаем название источника
-                    source_link = await item.query_selector(
-                        self.selectors["source_links"]
-                    )
+                    source_link = await self.selector_engine.query(item, "source_links")
                     if source_link:
                         source_text = await source_link.inner_text()
                         # Убираем иконки и лишние символы
@@ -469,37 +549,49 @@ class DzenRSSNewsScraper:
                             source_names.append(source_text)
 
             except Exception as e:
-                logger.warning(f"Не удалось получить саммари для {story['title']}: {e}")
+                logger.warning(
+                    "Не удалось получить саммари для %s: %s", story["title"], e
+                )
 
             # Формируем полное описание
             full_description = ""
 
             # Получаем полные тексты статей
             article_texts = []
+            detail_links = None
             try:
-                article_texts = await self.get_article_full_texts(story["url"])
+                article_texts, detail_links = await self.get_article_full_texts(
+                    story["url"], lease
+                )
                 if article_texts:
-                    logger.info(f"Получено {len(article_texts)} полных текстов статей")
+                    logger.info("Получено %s полных текстов статей", len(article_texts))
 
                 # Возвращаемся обратно к странице сюжета
-                await self.page.goto(
-                    story["url"], wait_until="domcontentloaded", timeout=30000
+                await self._goto(
+                    story["url"], wait_until="domcontentloaded", lease=lease
                 )
-                await self.page.wait_for_timeout(1000)
+                await page.wait_for_timeout(1000)
             except Exception as e:
-                logger.warning(f"Ошибка при получении полных текстов: {e}")
+                logger.warning("Ошибка при получении полных текстов: %s", e)
 
             # Формируем итоговый контент
             final_content = full_description
             if article_texts:
                 full_articles_text = (
-                    "\n\n--- ПОЛНЫЕ ТЕКСТЫ СТАТЕЙ ---\n\n"
-                    + "\n\n---\n\n".join(article_texts)
+                    f"\n\n{FULL_TEXTS_HEADER}\n\n"
+                    + ARTICLE_SEPARATOR.join(article_texts)
                 )
                 final_content = f"{full_description}\n\n{full_articles_text}"
 
             # Отмечаем новость как обработанную в базе данных
-            self.mark_story_processed(story["url"], story["id"], title, story["rubric"])
+            self.mark_story_processed(
+                story["url"],
+                story["id"],
+                title,
+                story["rubric"],
+                ARTICLE_SEPARATOR.join(article_texts),
+                detail_links,
+            )
 
             return {
                 "id": story["id"],
@@ -508,12 +600,15 @@ class DzenRSSNewsScraper:
                 "rubric": story["rubric"],
                 "rubric_slug": story["rubric_slug"],
                 "summary": final_content,
+                "sources": source_names,
                 "pub_date": datetime.now(timezone.utc).isoformat(),
                 "scraped_at": datetime.now().isoformat(),
             }
 
         except Exception as e:
-            logger.error(f"Ошибка при получении контента сюжета {story['title']}: {e}")
+            logger.error(
+                "Ошибка при получении контента сюжета %s: %s", story["title"], e
+            )
             # Возвращаем базовую информацию в случае ошибки
             return {
                 "id": story["id"],
@@ -522,93 +617,24 @@ class DzenRSSNewsScraper:
                 "rubric": story["rubric"],
                 "rubric_slug": story["rubric_slug"],
                 "summary": "",
+                "sources": [],
                 "pub_date": datetime.now(timezone.utc).isoformat(),
                 "scraped_at": datetime.now().isoformat(),
             }
 
     def generate_rss(self, news_items: List[Dict]) -> str:
         """Генерирует RSS-ленту"""
-        # Создаем корневой элемент RSS
-        rss = ET.Element("rss", version="2.0")
-        rss.set("xmlns:content", "http://purl.org/rss/1.0/modules/content/")
-        rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
-
-        channel = ET.SubElement(rss, "channel")
-
-        # Метаданные канала
-        ET.SubElement(channel, "title").text = "Dzen.ru - Новости"
-        ET.SubElement(channel, "link").text = "https://dzen.ru/news"
-        ET.SubElement(
-            channel, "description"
-        ).text = "Новости с портала Dzen.ru по всем рубрикам"
-        ET.SubElement(channel, "language").text = "ru-RU"
-        ET.SubElement(channel, "lastBuildDate").text = datetime.now(
-            timezone.utc
-        ).strftime("%a, %d %b %Y %H:%M:%S %z")
-        ET.SubElement(channel, "generator").text = "Dzen RSS Scraper"
-
-        # Добавляем элементы новостей
-        for item_data in news_items:
-            item = ET.SubElement(channel, "item")
-
-            ET.SubElement(item, "title").text = item_data["title"]
-            ET.SubElement(item, "link").text = item_data["url"]
-            ET.SubElement(item, "guid").text = item_data["id"]
-            ET.SubElement(item, "category").text = item_data["rubric"]
-
-            # Описание
-            description = item_data.get("summary", "")
-
-            ET.SubElement(item, "description").text = (
-                description[:1000] + "..." if len(description) > 1000 else description
-            )
-
-            # Полный контент
-            content_elem = ET.SubElement(
-                item, "{http://purl.org/rss/1.0/modules/content/}encoded"
-            )
-            content_elem.text = f"<![CDATA[{description}]]>"
-
-            # Дата публикации
-            if "pub_date" in item_data:
-                try:
-                    pub_date = datetime.fromisoformat(
-                        item_data["pub_date"].replace("Z", "+00:00")
-                    )
-                    ET.SubElement(item, "pubDate").text = pub_date.strftime(
-                        "%a, %d %b %Y %H:%M:%S %z"
-                    )
-                except Exception:
-                    ET.SubElement(item, "pubDate").text = datetime.now(
-                        timezone.utc
-                    ).strftime("%a, %d %b %Y %H:%M:%S %z")
-
-        # Форматируем XML с отступами
-        self._indent_xml(rss)
-        xml_content = ET.tostring(rss, encoding="unicode", method="xml")
-
-        # Добавляем XML декларацию для читаемости
-        return f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_content}'
-
-    def _indent_xml(self, elem, level=0):
-        """Добавляет отступы для читаемости XML"""
-        i = "\n" + level * "  "
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for elem in elem:
-                self._indent_xml(elem, level + 1)
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
+        return generate_rss(news_items)
 
     async def scrape_all_news(self) -> List[Dict]:
         """Основной метод для сбора всех новостей"""
+        all_news = []
         try:
+            # Создаем директории и базу данных только перед реальным обходом
+            Config.create_directories()
+            self.init_database()
+            recover_partial_runs(Config.OUTPUT_DIR)
+
             await self.init_browser()
 
             # Получаем все рубрики
@@ -617,66 +643,220 @@ class DzenRSSNewsScraper:
                 logger.error("Не удалось получить рубрики")
                 return []
 
-            all_news = []
+            self.partial_file = os.path.join(
+                Config.OUTPUT_DIR,
+                f"dzen_news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.partial.jsonl",
+            )
 
-            rubrics = rubrics[:1]
-            for rubric in rubrics:
-                await asyncio.sleep(random.uniform(2, 4))
-                stories = await self.get_stories_from_rubric(rubric)
-                stories = stories[:3]
+            # Сначала собираем сюжеты всех рубрик в очередь, затем обрабатываем
+            # самые ценные, пока не кончится время запуска
+            budget = Config.RUN_TIME_BUDGET
+            started = time.monotonic()
+            frontier = CrawlFrontier(
+                rubric_weights=Config.RUBRIC_WEIGHTS,
+                max_per_rubric=Config.MAX_STORIES_PER_RUBRIC,
+                deadline=started + budget if budget else None,
+            )
 
-                for story in stories:
-                    try:
-                        await asyncio.sleep(random.uniform(1, 3))
-                        full_story = await self.get_story_content(story)
-                        all_news.append(full_story)
-                        logger.info(f"Обработано: {full_story['title']}")
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при обработке сюжета {story['title']}: {e}"
-                        )
-                        basic_story = {
-                            "id": story["id"],
-                            "title": story["title"],
-                            "url": self.clean_story_url(story["url"]),
-                            "rubric": story["rubric"],
-                            "rubric_slug": story["rubric_slug"],
-                            "summary": "Контент недоступен",
-                            "pub_date": datetime.now(timezone.utc).isoformat(),
-                            "scraped_at": datetime.now().isoformat(),
-                        }
-                        all_news.append(basic_story)
-                        self.mark_story_processed(
-                            story["url"], story["id"], story["title"], story["rubric"]
-                        )
+            # На обзор рубрик отводим не больше трети бюджета
+            await self.collect_stories(
+                rubrics[: Config.MAX_RUBRICS],
+                frontier,
+                deadline=started + budget / 3 if budget else None,
+            )
+            await self.process_frontier(
+                frontier, Config.MAX_ARTICLES, all_news, on_item=self._flush_item
+            )
 
-            logger.info(f"Всего собрано новостей: {len(all_news)}")
+            if frontier.expired():
+                logger.warning(
+                    "Время запуска (%s с) истекло, в очереди осталось %s сюжетов",
+                    budget,
+                    len(frontier),
+                )
+            logger.info("Всего собрано новостей: %s", len(all_news))
+            logger.info(
+                "Память: %s, пик браузера %.0f МБ, пересозданий контекстов: %s",
+                self.memory_governor.snapshot(),
+                self.memory_governor.peak_browser_mb,
+                self.memory_governor.recycles,
+            )
+            for host, host_metrics in self.rate_limiter.metrics().items():
+                logger.info("Метрики ограничителя %s: %s", host, host_metrics)
+            for identity_stats in self.context_pool.stats():
+                logger.info("Идентичность: %s", identity_stats)
+            for field, field_health in self.selector_engine.health().items():
+                logger.info("Селекторы %s: %s", field, field_health)
             return all_news
 
         except Exception as e:
-            logger.error(f"Ошибка при сборе новостей: {e}")
-            return []
+            # Уже обработанные сюжеты сохраняем, а не теряем вместе с запуском
+            logger.error(
+                "Ошибка при сборе новостей: %s (сохраняем собранные: %s)",
+                e,
+                len(all_news),
+            )
+            return all_news
         finally:
-            if self.browser:
-                await self.browser.close()
-            if hasattr(self, "playwright"):
-                await self.playwright.stop()
+            self.selector_engine.save()
+            await self.close_browser()
+
+    async def collect_stories(
+        self,
+        rubrics: List[Dict[str, str]],
+        frontier: CrawlFrontier,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Собирает сюжеты рубрик в очередь, пока не наступит deadline
+        (time.monotonic()). Рубрики открываются в основном контексте
+        """
+        if self.lease is None:
+            self.lease = await self.context_pool.acquire()
+            self.page = self.lease.page
+        for rubric in rubrics:
+            if deadline is not None and time.monotonic() > deadline:
+                logger.warning("Время на обзор рубрик исчерпано, переходим к сюжетам")
+                break
+            for story in await self.get_stories_from_rubric(rubric):
+                frontier.push(
+                    story, story["position"], story["first_seen"], story["is_new"]
+                )
+
+    async def process_frontier(
+        self,
+        frontier: CrawlFrontier,
+        limit: int,
+        results: List[Dict],
+        on_item=None,
+    ):
+        """
+        Обрабатывает до limit сюжетов из очереди параллельными воркерами.
+
+        Каждый воркер берет свой контекст пула на время сюжета, одновременные
+        переходы дополнительно ограничивает AIMD. Новости дописываются в
+        results по мере готовности, чтобы пережить ошибку посреди обхода.
+        """
+        # Основной контекст тоже отдаем воркерам
+        if self.lease is not None:
+            await self._release_lease(self.lease)
+            self.lease = self.page = None
+
+        workers = min(Config.MAX_CONCURRENCY, self.context_pool.size)
+        logger.info("Сюжетов в очереди: %s, воркеров: %s", len(frontier), workers)
+        claimed = 0
+
+        async def worker():
+            nonlocal claimed
+            while claimed < limit:
+                story = frontier.pop()
+                if story is None:
+                    return
+                claimed += 1
+                item = await self._process_story(story)
+                if item is not None:
+                    results.append(item)
+                    if on_item:
+                        on_item(item)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    async def _process_story(self, story: Dict) -> Optional[Dict]:
+        """
+        Обрабатывает сюжет в свободном контексте пула.
+
+        Возвращает None, если повторный обход сюжета не дал полного текста:
+        такой сюжет уже был в выдаче прошлого запуска.
+        """
+        # Все записи лога внутри обработки сюжета помечаются его ID
+        story_token = story_id_var.set(story["id"])
+        try:
+            lease = await self.context_pool.acquire()
+            try:
+                full_story = await self.get_story_content(story, lease)
+            except Exception as e:
+                logger.error("Ошибка при обработке сюжета %s: %s", story["title"], e)
+                self.mark_story_processed(
+                    story["url"], story["id"], story["title"], story["rubric"]
+                )
+                full_story = {
+                    "id": story["id"],
+                    "title": story["title"],
+                    "url": self.clean_story_url(story["url"]),
+                    "rubric": story["rubric"],
+                    "rubric_slug": story["rubric_slug"],
+                    "summary": "Контент недоступен",
+                    "sources": [],
+                    "pub_date": datetime.now(timezone.utc).isoformat(),
+                    "scraped_at": datetime.now().isoformat(),
+                }
+            finally:
+                await self._release_lease(lease)
+
+            if not story["is_new"]:
+                state = self.db.processed_state(story["url"])
+                if not (state and state["has_text"]):
+                    logger.info(
+                        "Повторный обход не дал полного текста: %s", full_story["title"]
+                    )
+                    return None
+            logger.info("Обработано: %s", full_story["title"])
+            return full_story
+        finally:
+            story_id_var.reset(story_token)
+
+    async def close_browser(self):
+        """Закрывает контексты, браузер и Playwright"""
+        if self.context_pool:
+            await self.context_pool.close()
+        if self.browser:
+            await self.browser.close()
+        if hasattr(self, "playwright"):
+            await self.playwright.stop()
+
+    def _flush_item(self, item: Dict):
+        """Дописывает новость в промежуточный файл, чтобы результат пережил падение"""
+        try:
+            with open(self.partial_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning("Не удалось дописать промежуточный результат: %s", e)
 
     async def save_results(self, news_items: List[Dict]):
         """Сохраняет результаты в файлы"""
+        import aiofiles
+
+        Config.create_directories()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        json_file = f"output/dzen_news_{timestamp}.json"
-        async with aiofiles.open(json_file, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(news_items, ensure_ascii=False, indent=2))
-        logger.info(f"JSON сохранен: {json_file}")
+        if "json" in Config.SAVE_FORMAT:
+            json_file = os.path.join(Config.OUTPUT_DIR, f"dzen_news_{timestamp}.json")
+            async with aiofiles.open(json_file, "w", encoding="utf-8") as f:
+                await f.write(json.dumps(news_items, ensure_ascii=False, indent=2))
+            logger.info("JSON сохранен: %s", json_file)
 
-        rss_content = self.generate_rss(news_items)
+        if "rss" in Config.SAVE_FORMAT:
+            rss_content = self.generate_rss(news_items)
+
+            current_rss_file = os.path.join(Config.OUTPUT_DIR, "dzen_news_current.rss")
+            async with aiofiles.open(current_rss_file, "w", encoding="utf-8") as f:
+                await f.write(rss_content)
+            logger.info("Актуальная RSS лента: %s", current_rss_file)
+
+        if "parquet" in Config.SAVE_FORMAT:
+            # Аналитический экспорт не должен ронять запуск
+            try:
+                exporter = ParquetExporter(Config.OUTPUT_DIR)
+                await asyncio.to_thread(exporter.export_run, news_items, timestamp)
+                # Заодно догружаем восстановленные результаты упавших запусков
+                await asyncio.to_thread(exporter.export_run_files)
+                await asyncio.to_thread(exporter.export_processed_news, self.db_path)
+            except Exception as e:
+                logger.error("Ошибка экспорта в Parquet: %s", e)
 
-        current_rss_file = "output/dzen_news_current.rss"
-        async with aiofiles.open(current_rss_file, "w", encoding="utf-8") as f:
-            await f.write(rss_content)
-        logger.info(f"Актуальная RSS лента: {current_rss_file}")
+        # Итоговые файлы записаны, промежуточный больше не нужен
+        if self.partial_file and os.path.exists(self.partial_file):
+            os.remove(self.partial_file)
 
 
 async def main():
@@ -684,18 +864,19 @@ async def main():
     scraper = DzenRSSNewsScraper()
 
     try:
-        logger.info("Запуск сбора новостей с Dzen.ru")
+        logger.info("Запуск сбора новостей с Dzen.ru (run_id %s)", new_run_id())
         news_items = await scraper.scrape_all_news()
 
         if news_items:
             await scraper.save_results(news_items)
-            logger.info(f"Успешно обработано {len(news_items)} новостей")
+            logger.info("Успешно обработано %s новостей", len(news_items))
         else:
             logger.warning("Не удалось собрать новости")
 
     except Exception as e:
-        logger.error(f"Критическая ошибка: {e}")
+        logger.error("Критическая ошибка: %s", e)
 
 
 if __name__ == "__main__":
+    setup_logging("dzen_scraper.log")
     asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Приоритетная очередь сюжетов (crawl frontier) по свежести и важности
+"""
+import heapq
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+class CrawlFrontier:
+    """
+    Очередь сюжетов, из которой первым берется самый ценный.
+
+    Оценка складывается из позиции карточки в рубрике, веса рубрики,
+    свежести (время первой встречи сюжета), числа рубрик, где сюжет
+    встретился, и того, нужен ли еще его полный текст. Повторно
+    встреченный сюжет переоценивается, устаревшие записи кучи
+    пропускаются при извлечении.
+    """
+
+    def __init__(
+        self,
+        rubric_weights: Optional[Dict[str, float]] = None,
+        default_rubric_weight: float = 0.5,
+        freshness_half_life_hours: float = 6.0,
+        max_per_rubric: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ):
+        self.rubric_weights = rubric_weights or {}
+        self.default_rubric_weight = default_rubric_weight
+        self.freshness_half_life_hours = freshness_half_life_hours
+        self.max_per_rubric = max_per_rubric
+        self.deadline = deadline  # time.monotonic(), после которого работа не выдается
+        self.entries: Dict[str, Dict] = {}
+        self.heap: List = []
+        self.taken_per_rubric: Dict[str, int] = {}
+        self._counter = itertools.count()
+
+    def score(self, entry: Dict) -> float:
+        """Ценность сюжета: чем больше, тем раньше он будет обработан"""
+        position_score = 1.0 / (1 + entry["position"])
+        rubric_score = self.rubric_weights.get(
+            entry["story"]["rubric"], self.default_rubric_weight
+        )
+        age_hours = max(
+            0.0,
+            (datetime.now(timezone.utc) - entry["first_seen"]).total_seconds() / 3600,
+        )
+        freshness_score = 0.5 ** (age_hours / self.freshness_half_life_hours)
+        sources_score = min(entry["sources"], 5) / 5
+        # Новый сюжет ценнее того, что уже сохранен без полного текста
+        missing_text_score = 1.0 if entry["is_new"] else 0.5
+
+        return (
+            position_score
+            + rubric_score
+            + freshness_score
+            + 0.5 * sources_score
+            + missing_text_score
+        )
+
+    def push(
+        self,
+        story: Dict,
+        position: int,
+        first_seen: datetime,
+        is_new: bool = True,
+    ):
+        """Добавляет сюжет или обновляет оценку уже известного"""
+        entry = self.entries.get(story["id"])
+        if entry is None:
+            entry = {
+                "story": story,
+                "position": position,
+                "first_seen": first_seen,
+                "sources": 1,
+                "is_new": is_new,
+                "done": False,
+            }
+            self.entries[story["id"]] = entry
+        elif entry["done"]:
+            return
+        else:
+            entry["sources"] += 1
+            entry["position"] = min(entry["position"], position)
+
+        entry["score"] = self.score(entry)
+        entry["version"] = next(self._counter)
+        heapq.heappush(self.heap, (-entry["score"], entry["version"], story["id"]))
+
+    def time_left(self) -> Optional[float]:
+        """Секунды до дедлайна запуска (None, если дедлайна нет)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        time_left = self.time_left()
+        return time_left is not None and time_left <= 0
+
+    def pop(self) -> Optional[Dict]:
+        """Самый ценный сюжет или None, если работы нет или вышло время"""
+        while self.heap and not self.expired():
+            _, version, story_id = heapq.heappop(self.heap)
+            entry = self.entries[story_id]
+            if entry["done"] or entry["version"] != version:
+                continue
+
+            rubric = entry["story"]["rubric"]
+            if (
+                self.max_per_rubric is not None
+                and self.taken_per_rubric.get(rubric, 0) >= self.max_per_rubric
+            ):
+                continue
+
+            entry["done"] = True
+            self.taken_per_rubric[rubric] = self.taken_per_rubric.get(rubric, 0) + 1
+            story = dict(entry["story"])
+            story["priority"] = round(entry["score"], 3)
+            return story
+        return None
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self.entries.values() if not entry["done"])
@@ -0,0 +1,151 @@
+"""
+Контроль памяти долгих запусков: замер памяти и решение о пересоздании страниц
+"""
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_rss_bytes(pid: int) -> int:
+    """RSS процесса по /proc (Linux), 0 если недоступно"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _proc_pss_bytes(pid: int) -> int:
+    """
+    PSS процесса по /proc/<pid>/smaps_rollup: общие страницы делятся между
+    процессами, которые их используют. RSS, если PSS недоступен
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return _proc_rss_bytes(pid)
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return children
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Имя процесса в скобках может содержать пробелы
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def process_rss_mb() -> float:
+    """RSS текущего процесса Python, МБ"""
+    rss = _proc_rss_bytes(os.getpid())
+    if not rss and resource is not None:
+        # Вне Linux берем пиковое значение: ru_maxrss в КБ (в байтах на macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return rss / (1024 * 1024)
+
+
+def descendants_pss_mb(pid: Optional[int] = None) -> float:
+    """
+    Суммарный PSS дочерних процессов (драйвер Playwright и Chromium), МБ.
+
+    Процессы Chromium делят много страниц (код, общая память), и сумма их
+    RSS учитывает такие страницы по разу на процесс, завышая расход
+    """
+    children = _children_map()
+    total = 0
+    stack = list(children.get(pid or os.getpid(), []))
+    while stack:
+        child = stack.pop()
+        total += _proc_pss_bytes(child)
+        stack.extend(children.get(child, []))
+    return total / (1024 * 1024)
+
+
+class MemoryGovernor:
+    """
+    Следит за памятью браузера и процесса Python.
+
+    Страницу пора пересоздать, если она сделала max_navigations переходов
+    или если браузер превысил browser_limit_mb. После полного пересоздания
+    повторное срабатывание по памяти возможно, только когда память опустится
+    ниже rearm_ratio от лимита или пройдет cooldown секунд, иначе при
+    стабильно высокой памяти контексты пересоздавались бы перед каждым
+    сюжетом. Последний замер доступен в snapshot() для логов и бенчмарка.
+    """
+
+    def __init__(
+        self,
+        max_navigations: int = 50,
+        browser_limit_mb: float = 1200,
+        rearm_ratio: float = 0.85,
+        cooldown: float = 300.0,
+    ):
+        self.max_navigations = max_navigations
+        self.browser_limit_mb = browser_limit_mb
+        self.rearm_ratio = rearm_ratio
+        self.cooldown = cooldown
+        self.armed = True
+        self.cooldown_until = 0.0
+        self.last_snapshot: Dict[str, float] = {}
+        self.peak_browser_mb = 0.0
+        self.recycles = 0
+
+    def snapshot(self) -> Dict[str, float]:
+        """Замеряет RSS процесса Python и PSS браузера"""
+        browser_mb = descendants_pss_mb()
+        self.peak_browser_mb = max(self.peak_browser_mb, browser_mb)
+        self.last_snapshot = {
+            "python_mb": round(process_rss_mb(), 1),
+            "browser_mb": round(browser_mb, 1),
+        }
+        return self.last_snapshot
+
+    def over_limit(self) -> bool:
+        """Браузер превысил порог памяти и пора пересоздать все контексты"""
+        browser_mb = self.snapshot()["browser_mb"]
+        if browser_mb < self.browser_limit_mb * self.rearm_ratio:
+            self.armed = True
+        if browser_mb <= self.browser_limit_mb:
+            return False
+        return self.armed or time.monotonic() >= self.cooldown_until
+
+    def should_recycle(self, navigations: int) -> bool:
+        """Пора ли пересоздать страницу после navigations переходов"""
+        return navigations >= self.max_navigations
+
+    def record_recycle(self, reason: str, count: int = 1, full: bool = False):
+        """Учитывает пересоздание; full - пересоздание всех контекстов по памяти"""
+        if full:
+            self.armed = False
+            self.cooldown_until = time.monotonic() + self.cooldown
+        self.recycles += count
+        logger.info(
+            "Пересоздано браузерных контекстов: %s (%s), память: %s",
+            count,
+            reason,
+            self.last_snapshot,
+        )
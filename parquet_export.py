@@ -0,0 +1,249 @@
+"""
+Экспорт новостей в партиционированный Parquet для аналитики
+
+Два набора данных в OUTPUT_DIR/parquet, оба партиционированы по date/rubric:
+- stories: результаты запусков (dzen_news_*.json или новости текущего запуска)
+- processed_news: таблица processed_news из SQLite
+
+Экспорт инкрементальный: уже выгруженные запуски и время последнего
+изменения строк базы хранятся в _export_state.json, каждый вызов дописывает
+только новые файлы. Строка, дополненная полным текстом после экспорта,
+выгружается еще раз: актуальна версия с наибольшим updated_at.
+"""
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from storage import FULL_TEXTS_HEADER, NewsDatabase
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "_export_state.json"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            "Для экспорта в Parquet нужен pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00").replace(" ", "T"))
+    except ValueError:
+        return None
+
+
+def _article_text_length(summary: str) -> int:
+    """
+    Длина полных текстов статей в summary, как в колонке text базы.
+
+    Заглушки вроде "Контент недоступен (timeout)" и сюжеты без полных
+    текстов дают 0.
+    """
+    _, header, texts = summary.partition(FULL_TEXTS_HEADER)
+    return len(texts.strip()) if header else 0
+
+
+def _stories_schema(pa):
+    return pa.schema(
+        [
+            ("story_id", pa.string()),
+            ("title", pa.string()),
+            ("url", pa.string()),
+            ("rubric", pa.string()),
+            ("rubric_slug", pa.string()),
+            ("source_names", pa.list_(pa.string())),
+            ("source_count", pa.int32()),
+            ("text_length", pa.int32()),
+            ("pub_date", pa.timestamp("us", tz="UTC")),
+            ("scraped_at", pa.timestamp("us")),
+            ("run", pa.string()),
+            ("date", pa.string()),
+        ]
+    )
+
+
+def _processed_schema(pa):
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("story_id", pa.string()),
+            ("story_url", pa.string()),
+            ("title", pa.string()),
+            ("rubric", pa.string()),
+            ("text_length", pa.int32()),
+            ("processed_at", pa.timestamp("us")),
+            ("updated_at", pa.timestamp("us")),
+            ("date", pa.string()),
+        ]
+    )
+
+
+class ParquetExporter:
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.root = Path(output_dir) / "parquet"
+        self.state_path = self.root / STATE_FILE
+
+    def _load_state(self) -> Dict:
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        return {"runs": [], "processed_news_last_id": 0}
+
+    def _save_state(self, state: Dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _write(self, table, dataset: str, basename: str):
+        import pyarrow.dataset as ds
+
+        ds.write_dataset(
+            table,
+            str(self.root / dataset),
+            format="parquet",
+            partitioning=["date", "rubric"],
+            partitioning_flavor="hive",
+            basename_template=f"{basename}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def _story_rows(self, news_items: List[Dict], run: str) -> Dict[str, List]:
+        columns = {name: [] for name in _stories_schema(_require_pyarrow()).names}
+        for item in news_items:
+            pub_date = _parse_ts(item.get("pub_date"))
+            scraped_at = _parse_ts(item.get("scraped_at"))
+            sources = item.get("sources") or []
+            partition_ts = pub_date or scraped_at
+            columns["story_id"].append(item.get("id"))
+            columns["title"].append(item.get("title"))
+            columns["url"].append(item.get("url"))
+            columns["rubric"].append(item.get("rubric") or "unknown")
+            columns["rubric_slug"].append(item.get("rubric_slug"))
+            columns["source_names"].append(sources)
+            columns["source_count"].append(len(sources))
+            columns["text_length"].append(
+                _article_text_length(item.get("summary") or "")
+            )
+            columns["pub_date"].append(pub_date)
+            columns["scraped_at"].append(
+                scraped_at.replace(tzinfo=None) if scraped_at else None
+            )
+            columns["run"].append(run)
+            columns["date"].append(
+                partition_ts.strftime("%Y-%m-%d") if partition_ts else "unknown"
+            )
+        return columns
+
+    def export_run(self, news_items: List[Dict], run: str) -> int:
+        """Дописывает новости одного запуска в набор stories"""
+        pa = _require_pyarrow()
+        state = self._load_state()
+        if run in state["runs"]:
+            return 0
+        if news_items:
+            table = pa.Table.from_pydict(
+                self._story_rows(news_items, run), schema=_stories_schema(pa)
+            )
+            self._write(table, "stories", f"run-{run}")
+            logger.info("Parquet: запуск %s, %s новостей", run, len(news_items))
+        state["runs"].append(run)
+        self._save_state(state)
+        return len(news_items)
+
+    def export_run_files(self) -> int:
+        """Дописывает все еще не выгруженные файлы dzen_news_*.json"""
+        exported = 0
+        done = set(self._load_state()["runs"])
+        for run_file in sorted(Path(self.output_dir).glob("dzen_news_*.json")):
+            run = run_file.stem[len("dzen_news_") :]
+            if run in done:
+                continue
+            with open(run_file, encoding="utf-8") as f:
+                exported += self.export_run(json.load(f), run)
+        return exported
+
+    def export_processed_news(self, db_path: str) -> int:
+        """Дописывает строки processed_news, добавленные или измененные после прошлого экспорта"""
+        pa = _require_pyarrow()
+        if not Path(db_path).is_file():
+            return 0
+        # Дополняет схему старых баз колонкой updated_at
+        NewsDatabase(db_path).init()
+
+        state = self._load_state()
+        watermark = state.get("processed_news_updated_at", "")
+        # Строки, выгруженные до появления updated_at, и не менявшиеся с тех пор
+        legacy_id = state.get("processed_news_last_id", 0)
+
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT id, story_id, story_url, title, rubric, "
+                "LENGTH(COALESCE(text, '')), processed_at, "
+                "COALESCE(updated_at, processed_at) AS changed_at "
+                "FROM processed_news "
+                "WHERE COALESCE(updated_at, processed_at) > ? "
+                "AND (updated_at IS NOT NULL OR id > ?) "
+                "ORDER BY changed_at, id",
+                (watermark, legacy_id),
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return 0
+
+        columns = {name: [] for name in _processed_schema(pa).names}
+        for (
+            row_id,
+            story_id,
+            url,
+            title,
+            rubric,
+            text_length,
+            processed_at,
+            changed_at,
+        ) in rows:
+            processed = _parse_ts(processed_at)
+            columns["id"].append(row_id)
+            columns["story_id"].append(story_id)
+            columns["story_url"].append(url)
+            columns["title"].append(title)
+            columns["rubric"].append(rubric or "unknown")
+            columns["text_length"].append(text_length)
+            columns["processed_at"].append(processed)
+            columns["updated_at"].append(_parse_ts(changed_at))
+            columns["date"].append(
+                processed.strftime("%Y-%m-%d") if processed else "unknown"
+            )
+
+        table = pa.Table.from_pydict(columns, schema=_processed_schema(pa))
+        last_changed = rows[-1][-1]
+        self._write(
+            table,
+            "processed_news",
+            f"upd-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}",
+        )
+        state["processed_news_updated_at"] = last_changed
+        self._save_state(state)
+        logger.info(
+            "Parquet: processed_news +%s строк (изменены до %s)",
+            len(rows),
+            last_changed,
+        )
+        return len(rows)
@@ -0,0 +1,226 @@
+"""
+Адаптивный ограничитель частоты запросов (AIMD) и детектор блокировок
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+# Признаки страницы-заглушки антибот-защиты Яндекса/Дзена (в нижнем регистре)
+CHALLENGE_URL_MARKERS = ("showcaptcha", "/captcha", "checkcaptcha")
+CHALLENGE_TEXT_MARKERS = (
+    "smartcaptcha",
+    "showcaptcha",
+    "подтвердите, что запросы отправляли вы",
+    "вы не робот?",
+    "я не робот",
+    "are you not a robot?",
+)
+RATE_WINDOW = 60.0  # окно, по которому считается фактическая скорость, с
+BLOCK_STATUSES = (403, 429)
+
+
+class BlockDetectedError(Exception):
+    """Страница вернула блокировку или капчу вместо контента"""
+
+
+def is_challenge_page(status: Optional[int], url: str = "", html: str = "") -> bool:
+    """Определяет, является ли ответ блокировкой или капчей"""
+    if status in BLOCK_STATUSES:
+        return True
+    lowered_url = (url or "").lower()
+    if any(marker in lowered_url for marker in CHALLENGE_URL_MARKERS):
+        return True
+    if html:
+        # Вызывающий передает только начало текста страницы: капча-страницы небольшие
+        lowered_html = html.lower()
+        return any(marker in lowered_html for marker in CHALLENGE_TEXT_MARKERS)
+    return False
+
+
+@dataclass
+class HostState:
+    """Состояние ограничителя для одного хоста"""
+
+    concurrency: float
+    interval: float
+    in_flight: int = 0
+    last_request: float = 0.0
+    cooldown_until: float = 0.0
+    latency_ewma: Optional[float] = None
+    requests: int = 0
+    successes: int = 0
+    slowdowns: int = 0
+    blocks: int = 0
+    recent: deque = field(default_factory=deque)  # время начала недавних запросов
+    condition: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class AdaptiveRateLimiter:
+    """
+    Ограничитель частоты запросов с обратной связью (AIMD).
+
+    Пока страницы отвечают быстро и без блокировок, параллельность
+    растет аддитивно, а интервал между запросами сокращается.
+    При блокировке или капче параллельность уменьшается мультипликативно,
+    интервал увеличивается и хост уходит на паузу.
+    """
+
+    def __init__(
+        self,
+        min_delay: float = 1.0,
+        max_delay: float = 60.0,
+        initial_delay: float = 2.0,
+        initial_concurrency: float = 1.0,
+        max_concurrency: float = 4.0,
+        target_latency: float = 5.0,
+        additive_increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        block_cooldown: float = 30.0,
+        jitter: float = 0.3,
+    ):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.block_cooldown = block_cooldown
+        self.jitter = jitter
+        self.hosts: Dict[str, HostState] = {}
+
+    def _host(self, url: str) -> HostState:
+        host = urlparse(url).netloc or url
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(
+                concurrency=self.initial_concurrency, interval=self.initial_delay
+            )
+            self.hosts[host] = state
+        return state
+
+    async def acquire(self, url: str):
+        """
+        Ждет разрешения на запрос к хосту.
+
+        Если ожидание прервано (например, отменой задачи) после того как
+        слот занят, слот освобождается, иначе хост остался бы без него навсегда.
+        """
+        state = self._host(url)
+        async with state.condition:
+            await state.condition.wait_for(
+                lambda: state.in_flight < max(1, int(state.concurrency))
+            )
+            state.in_flight += 1
+
+        try:
+            now = time.monotonic()
+            jitter = random.uniform(1 - self.jitter, 1 + self.jitter)
+            ready_at = max(
+                state.last_request + state.interval * jitter, state.cooldown_until
+            )
+            state.last_request = max(now, ready_at)
+            state.recent.append(state.last_request)
+            if ready_at > now:
+                await asyncio.sleep(ready_at - now)
+        except BaseException:
+            await self.release(url)
+            raise
+
+    async def release(self, url: str):
+        """Освобождает слот хоста"""
+        state = self._host(url)
+        async with state.condition:
+            state.in_flight = max(0, state.in_flight - 1)
+            state.condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        """Слот хоста на время одного запроса: acquire и гарантированный release"""
+        await self.acquire(url)
+        try:
+            yield
+        finally:
+            await self.release(url)
+
+    def record(
+        self,
+        url: str,
+        latency: float,
+        status: Optional[int] = None,
+        blocked: bool = False,
+    ):
+        """Учитывает результат запроса и корректирует скорость"""
+        state = self._host(url)
+        state.requests += 1
+        state.latency_ewma = (
+            latency
+            if state.latency_ewma is None
+            else 0.8 * state.latency_ewma + 0.2 * latency
+        )
+
+        if blocked:
+            state.blocks += 1
+            state.concurrency = max(1.0, state.concurrency * self.decrease_factor)
+            state.interval = min(self.max_delay, state.interval * 2)
+            state.cooldown_until = time.monotonic() + self.block_cooldown
+            logger.warning(
+                "Обнаружена блокировка %s (статус %s), снижаем скорость: "
+                "параллельность %.2f, интервал %.2fс",
+                urlparse(url).netloc,
+                status,
+                state.concurrency,
+                state.interval,
+            )
+        elif (status is not None and status >= 500) or latency > self.target_latency:
+            state.slowdowns += 1
+            state.concurrency = max(1.0, state.concurrency * 0.75)
+            state.interval = min(self.max_delay, state.interval * 1.25)
+        else:
+            state.successes += 1
+            state.concurrency = min(
+                self.max_concurrency,
+                state.concurrency + self.additive_increase / state.concurrency,
+            )
+            state.interval = max(self.min_delay, state.interval * 0.9)
+
+    def _measured_rate(self, state: HostState) -> float:
+        now = time.monotonic()
+        while state.recent and state.recent[0] < now - RATE_WINDOW:
+            state.recent.popleft()
+        if not state.recent:
+            return 0.0
+        # Пока окно не заполнилось, делим на фактически прошедшее время
+        elapsed = min(RATE_WINDOW, max(now - state.recent[0], state.interval, 1e-6))
+        return len(state.recent) / elapsed
+
+    def current_rate(self, url: str) -> float:
+        """Фактическая скорость запросов к хосту за последнюю минуту, запросов в секунду"""
+        return self._measured_rate(self._host(url))
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Метрики ограничителя по хостам"""
+        return {
+            host: {
+                "rate_per_sec": round(self._measured_rate(state), 3),
+                "concurrency": round(state.concurrency, 2),
+                "in_flight": state.in_flight,
+                "interval": round(state.interval, 2),
+                "latency_ewma": round(state.latency_ewma or 0.0, 2),
+                "requests": state.requests,
+                "successes": state.successes,
+                "slowdowns": state.slowdowns,
+                "blocks": state.blocks,
+            }
+            for host, state in self.hosts.items()
+        }
@@ -0,0 +1,88 @@
+"""
+Генерация RSS-ленты из собранных новостей
+"""
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Dict, List
+
+
+def generate_rss(news_items: List[Dict]) -> str:
+    """Генерирует RSS-ленту"""
+    # Создаем корневой элемент RSS
+    rss = ET.Element("rss", version="2.0")
+    rss.set("xmlns:content", "http://purl.org/rss/1.0/modules/content/")
+    rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
+
+    channel = ET.SubElement(rss, "channel")
+
+    # Метаданные канала
+    ET.SubElement(channel, "title").text = "Dzen.ru - Новости"
+    ET.SubElement(channel, "link").text = "https://dzen.ru/news"
+    ET.SubElement(
+        channel, "description"
+    ).text = "Новости с портала Dzen.ru по всем рубрикам"
+    ET.SubElement(channel, "language").text = "ru-RU"
+    ET.SubElement(channel, "lastBuildDate").text = datetime.now(
+        timezone.utc
+    ).strftime("%a, %d %b %Y %H:%M:%S %z")
+    ET.SubElement(channel, "generator").text = "Dzen RSS Scraper"
+
+    # Добавляем элементы новостей
+    for item_data in news_items:
+        item = ET.SubElement(channel, "item")
+
+        ET.SubElement(item, "title").text = item_data["title"]
+        ET.SubElement(item, "link").text = item_data["url"]
+        ET.SubElement(item, "guid").text = item_data["id"]
+        ET.SubElement(item, "category").text = item_data["rubric"]
+
+        # Описание
+        description = item_data.get("summary", "")
+
+        ET.SubElement(item, "description").text = (
+            description[:1000] + "..." if len(description) > 1000 else description
+        )
+
+        # Полный контент
+        content_elem = ET.SubElement(
+            item, "{http://purl.org/rss/1.0/modules/content/}encoded"
+        )
+        content_elem.text = f"<![CDATA[{description}]]>"
+
+        # Дата публикации
+        if "pub_date" in item_data:
+            try:
+                pub_date = datetime.fromisoformat(
+                    item_data["pub_date"].replace("Z", "+00:00")
+                )
+                ET.SubElement(item, "pubDate").text = pub_date.strftime(
+                    "%a, %d %b %Y %H:%M:%S %z"
+                )
+            except Exception:
+                ET.SubElement(item, "pubDate").text = datetime.now(
+                    timezone.utc
+                ).strftime("%a, %d %b %Y %H:%M:%S %z")
+
+    # Форматируем XML с отступами
+    _indent_xml(rss)
+    xml_content = ET.tostring(rss, encoding="unicode", method="xml")
+
+    # Добавляем XML декларацию для читаемости
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_content}'
+
+
+def _indent_xml(elem, level=0):
+    """Добавляет отступы для читаемости XML"""
+    i = "\n" + level * "  "
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = i + "  "
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+        for elem in elem:
+            _indent_xml(elem, level + 1)
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+    else:
+        if level and (not elem.tail or not elem.tail.strip()):
+            elem.tail = i
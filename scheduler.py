@@ -9,17 +9,9 @@ import logging
 import schedule
 import time
 from dzen_scraper import main as dzen_main
-from config import Config
-
-# Настройка логирования
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format=Config.LOG_FORMAT,
-    handlers=[
-        logging.FileHandler(f"{Config.LOGS_DIR}/scheduler.log"),
-        logging.StreamHandler(),
-    ],
-)
+from config import Config, ConfigError
+from structured_logging import setup_logging
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,17 +27,31 @@ class NewsScraperScheduler:
             return
 
         self.is_running = True
+        self.reload_config()
         logger.info("Запуск планированного скрапинга...")
 
         try:
             await dzen_main()
 
         except Exception as e:
-            logger.error(f"Ошибка при выполнении планированного скрапинга: {e}")
+            logger.error("Ошибка при выполнении планированного скрапинга: %s", e)
 
         finally:
             self.is_running = False
 
+    def reload_config(self):
+        """Перечитывает настройки перед запуском, без перезапуска демона"""
+        try:
+            changed = Config.reload()
+        except ConfigError as e:
+            logger.error("Новая конфигурация отклонена, используем прежнюю: %s", e)
+            return
+
+        for name, value in changed.items():
+            logger.info("Настройка обновлена: %s=%s", name, value)
+        if "LOG_LEVEL" in changed:
+            logging.getLogger().setLevel(getattr(logging, Config.LOG_LEVEL))
+
     def schedule_job(self):
         """Синхронная обертка для асинхронной задачи"""
         asyncio.run(self.run_scraper_job())
@@ -84,12 +90,13 @@ class NewsScraperScheduler:
                 logger.info("Получен сигнал остановки. Завершение работы...")
                 break
             except Exception as e:
-                logger.error(f"Ошибка в планировщике: {e}")
+                logger.error("Ошибка в планировщике: %s", e)
                 time.sleep(60)
 
 
 def main():
     """Основная функция"""
+    setup_logging("scheduler.log", "dzen_scraper.log")
     scheduler = NewsScraperScheduler()
 
     # Запуск немедленно при старте
@@ -0,0 +1,218 @@
+"""
+Движок селекторов: цепочки запасных селекторов и учет их попаданий
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SelectorEngine:
+    """
+    Ищет элементы по упорядоченным цепочкам селекторов для каждого поля.
+
+    Для каждого селектора ведется скользящая (EWMA) доля попаданий,
+    сохраняемая между запусками. Селекторы пробуются в порядке конфига:
+    запасной селектор часто шире основного и находит его надмножество,
+    поэтому он не должен вытеснять основной после случайного промаха.
+    Селектор уходит в конец цепочки, только когда его доля попаданий падает
+    ниже demote_below, а каждый probe_every-й поиск поля (и первый в запуске)
+    снова идет в порядке конфига, чтобы починившийся селектор вернул место.
+    Ожидание ждет только текущий селектор и стоящие в конфиге выше него:
+    иначе оно завершалось бы по самому широкому запасному.
+
+    Каждый поиск учитывается в доле попаданий поля не больше одного раза:
+    если за ожиданием следует выборка того же поля, выборку вызывают с
+    record=False. Необязательные поля (которых может законно не быть у
+    элемента) в доле попаданий и алертах не участвуют.
+    """
+
+    def __init__(
+        self,
+        chains: Dict[str, List[str]],
+        stats_path: Optional[str] = None,
+        decay: float = 0.8,
+        alert_threshold: float = 0.3,
+        min_samples: int = 5,
+        optional_fields: Optional[List[str]] = None,
+        demote_below: float = 0.3,
+        probe_every: int = 10,
+    ):
+        self.chains = {field: list(selectors) for field, selectors in chains.items()}
+        self.stats_path = stats_path
+        self.decay = decay
+        self.alert_threshold = alert_threshold
+        self.min_samples = min_samples
+        self.optional_fields = set(optional_fields or [])
+        self.demote_below = demote_below
+        self.probe_every = probe_every
+        # поле -> число поисков в этом запуске, для перепроверки порядка конфига
+        self.lookups: Dict[str, int] = {}
+        # поле -> селектор -> {"score": EWMA попаданий, "hits": n, "misses": n}
+        self.selector_stats: Dict[str, Dict[str, Dict]] = {}
+        # поле -> {"score": EWMA успеха поля, "samples": n, "alerted": bool}
+        self.field_stats: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        """Загружает статистику попаданий прошлых запусков"""
+        if not self.stats_path or not Path(self.stats_path).exists():
+            return
+        try:
+            with open(self.stats_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.selector_stats = data.get("selectors", {})
+            self.field_stats = data.get("fields", {})
+            # Старая статистика необязательных полей не должна давать алерты
+            for field in self.optional_fields:
+                self.field_stats.pop(field, None)
+        except Exception as e:
+            logger.warning("Не удалось загрузить статистику селекторов: %s", e)
+
+    def save(self):
+        """Сохраняет статистику попаданий для следующих запусков"""
+        if not self.stats_path:
+            return
+        try:
+            with open(self.stats_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"selectors": self.selector_stats, "fields": self.field_stats},
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+        except Exception as e:
+            logger.warning("Не удалось сохранить статистику селекторов: %s", e)
+
+    def _score(self, field: str, selector: str) -> float:
+        # Неопробованные селекторы считаются рабочими
+        return self.selector_stats.get(field, {}).get(selector, {}).get("score", 1.0)
+
+    def ordered(self, field: str) -> List[str]:
+        """Цепочка поля: рабочие селекторы в порядке конфига, затем разжалованные"""
+        chain = self.chains[field]
+        return sorted(
+            chain,
+            key=lambda selector: (
+                self._score(field, selector) < self.demote_below,
+                chain.index(selector),
+            ),
+        )
+
+    def _lookup_order(self, field: str) -> List[str]:
+        """Порядок для очередного поиска: периодически перепроверяет порядок конфига"""
+        count = self.lookups.get(field, 0)
+        self.lookups[field] = count + 1
+        if count % self.probe_every == 0:
+            return list(self.chains[field])
+        return self.ordered(field)
+
+    def _readiness_selectors(self, field: str) -> List[str]:
+        """Текущий селектор поля и все, что стоят в конфиге выше него"""
+        chain = self.chains[field]
+        return chain[: chain.index(self.ordered(field)[0]) + 1]
+
+    def _record_selector(self, field: str, selector: str, hit: bool):
+        stats = self.selector_stats.setdefault(field, {}).setdefault(
+            selector, {"score": 1.0, "hits": 0, "misses": 0}
+        )
+        stats["score"] = self.decay * stats["score"] + (1 - self.decay) * hit
+        stats["hits" if hit else "misses"] += 1
+
+    def _record_field(self, field: str, hit: bool):
+        if field in self.optional_fields:
+            return
+        stats = self.field_stats.setdefault(
+            field, {"score": 1.0, "samples": 0, "alerted": False}
+        )
+        stats["score"] = self.decay * stats["score"] + (1 - self.decay) * hit
+        stats["samples"] += 1
+
+        if (
+            stats["samples"] >= self.min_samples
+            and stats["score"] < self.alert_threshold
+            and not stats["alerted"]
+        ):
+            stats["alerted"] = True
+            logger.error(
+                "ВНИМАНИЕ: доля попаданий селекторов поля '%s' упала до %.0f%%, "
+                "вероятно, Dzen изменил верстку. Цепочка: %s",
+                field,
+                stats["score"] * 100,
+                self.ordered(field),
+            )
+        elif stats["alerted"] and stats["score"] >= self.alert_threshold:
+            stats["alerted"] = False
+            logger.info("Селекторы поля '%s' снова находят элементы", field)
+
+    async def query_all(self, scope, field: str, record: bool = True) -> List:
+        """Все элементы по первому сработавшему селектору цепочки"""
+        for selector in self._lookup_order(field):
+            try:
+                elements = await scope.query_selector_all(selector)
+            except Exception:
+                elements = []
+            self._record_selector(field, selector, bool(elements))
+            if elements:
+                if record:
+                    self._record_field(field, True)
+                return elements
+        if record:
+            self._record_field(field, False)
+        return []
+
+    async def query(self, scope, field: str, record: bool = True):
+        """Первый элемент по первому сработавшему селектору цепочки"""
+        for selector in self._lookup_order(field):
+            try:
+                element = await scope.query_selector(selector)
+            except Exception:
+                element = None
+            self._record_selector(field, selector, element is not None)
+            if element is not None:
+                if record:
+                    self._record_field(field, True)
+                return element
+        if record:
+            self._record_field(field, False)
+        return None
+
+    async def wait_for(
+        self, page, field: str, timeout: int, record: bool = True
+    ) -> bool:
+        """
+        Ждет появления текущего селектора цепочки или стоящего выше него,
+        без исключения по таймауту.
+
+        По таймауту каждому ожидавшемуся селектору засчитывается промах,
+        иначе вызывающий код, не дойдя до выборки, никогда не разжаловал бы
+        пропавший селектор. С record=False ожидание служит только проверкой
+        готовности страницы и не влияет ни на долю попаданий поля, ни на
+        статистику селекторов.
+        """
+        selectors = self._readiness_selectors(field)
+        try:
+            await page.wait_for_selector(", ".join(selectors), timeout=timeout)
+            found = True
+        except Exception:
+            found = False
+        if record:
+            if not found:
+                for selector in selectors:
+                    self._record_selector(field, selector, False)
+            self._record_field(field, found)
+        return found
+
+    def health(self) -> Dict[str, Dict]:
+        """Текущая доля попаданий по полям и лучший селектор каждого поля"""
+        return {
+            field: {
+                "hit_rate": round(self.field_stats.get(field, {}).get("score", 1.0), 3),
+                "samples": self.field_stats.get(field, {}).get("samples", 0),
+                "best_selector": self.ordered(field)[0],
+                "optional": field in self.optional_fields,
+            }
+            for field in self.chains
+        }
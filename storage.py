@@ -0,0 +1,305 @@
+"""
+Хранилище обработанных новостей (SQLite) и файлов запусков
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Промежуточный файл, который не дописывался столько секунд, считается
+# оставшимся от упавшего запуска
+PARTIAL_STALE_SECONDS = 15 * 60
+
+# Заголовок, после которого в summary файла запуска идут полные тексты статей,
+# и разделитель статей (в summary и в колонке text базы)
+FULL_TEXTS_HEADER = "--- ПОЛНЫЕ ТЕКСТЫ СТАТЕЙ ---"
+ARTICLE_SEPARATOR = "\n\n---\n\n"
+
+# Колонки, добавленные после первой версии схемы: имя -> определение
+_PROCESSED_NEWS_COLUMNS = {
+    "text_attempts": "INTEGER DEFAULT 1",
+    "detail_links": "INTEGER",
+    # Время последнего изменения строки (с миллисекундами) для инкрементального экспорта
+    "updated_at": "TIMESTAMP",
+}
+
+
+def clean_story_url(url: str) -> str:
+    """Очищает URL от лишних параметров, оставляя только базовую часть"""
+    try:
+        parsed = urlparse(url)
+
+        path_parts = parsed.path.split("/")
+        if "story" in path_parts:
+            story_index = path_parts.index("story")
+            if len(path_parts) > story_index + 1:
+                story_id = path_parts[story_index + 1]
+                clean_url = f"https://dzen.ru/news/story/{story_id}"
+                return clean_url
+
+        return url
+
+    except Exception as e:
+        logger.warning("Ошибка при очистке URL %s: %s", url, e)
+        return url
+
+
+def recover_partial_runs(
+    output_dir: str, min_age: float = PARTIAL_STALE_SECONDS
+) -> List[Path]:
+    """
+    Превращает промежуточные dzen_news_*.partial.jsonl упавших запусков
+    в обычные файлы запусков dzen_news_*.json и возвращает их пути.
+
+    Файлы моложе min_age секунд не трогаются: их может дописывать
+    работающий сейчас запуск.
+    """
+    recovered = []
+    for partial in sorted(Path(output_dir).glob("dzen_news_*.partial.jsonl")):
+        try:
+            if time.time() - partial.stat().st_mtime < min_age:
+                continue
+            items = []
+            for line in partial.read_text(encoding="utf-8").splitlines():
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Последняя строка могла оборваться при падении
+                    continue
+
+            run_file = partial.with_name(
+                partial.name.replace(".partial.jsonl", ".json")
+            )
+            if items and not run_file.exists():
+                tmp_file = run_file.with_suffix(".tmp")
+                tmp_file.write_text(
+                    json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8"
+                )
+                os.replace(tmp_file, run_file)
+                recovered.append(run_file)
+                logger.warning(
+                    "Восстановлен результат упавшего запуска: %s (%s новостей)",
+                    run_file,
+                    len(items),
+                )
+            partial.unlink()
+        except OSError as e:
+            logger.warning("Не удалось восстановить %s: %s", partial, e)
+    return recovered
+
+
+class NewsDatabase:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def init(self):
+        """Инициализирует SQLite базу данных"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # Создаем таблицу для уникальных новостей
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS processed_news (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    story_url TEXT UNIQUE NOT NULL,
+                    story_id TEXT NOT NULL,
+                    title TEXT,
+                    rubric TEXT,
+                    text TEXT,
+                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Базы старых версий дополняем недостающими колонками
+            existing = {
+                row[1] for row in cursor.execute("PRAGMA table_info(processed_news)")
+            }
+            for column, definition in _PROCESSED_NEWS_COLUMNS.items():
+                if column not in existing:
+                    cursor.execute(
+                        f"ALTER TABLE processed_news ADD COLUMN {column} {definition}"
+                    )
+
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_story_url ON processed_news(story_url)
+            """)
+
+            # Когда сюжет впервые попался в рубриках (для приоритета свежести)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS story_sightings (
+                    story_url TEXT PRIMARY KEY,
+                    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    times_seen INTEGER DEFAULT 1
+                )
+            """)
+
+            conn.commit()
+            conn.close()
+            logger.info("База данных инициализирована: %s", self.db_path)
+
+        except Exception as e:
+            logger.error("Ошибка при инициализации базы данных: %s", e)
+
+    def processed_state(self, story_url: str) -> Optional[Dict]:
+        """
+        Состояние новости в базе: None, если не обрабатывалась, иначе
+        has_text (сохранен полный текст), text_attempts (сколько раз сюжет
+        обходили) и detail_links (ссылок на статьи на странице сюжета,
+        None - неизвестно)
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute(
+                "SELECT COALESCE(text, '') != '', COALESCE(text_attempts, 1), "
+                "detail_links FROM processed_news WHERE story_url = ?",
+                (clean_story_url(story_url),),
+            ).fetchone()
+            conn.close()
+
+            if row is None:
+                return None
+            return {
+                "has_text": bool(row[0]),
+                "text_attempts": row[1],
+                "detail_links": row[2],
+            }
+
+        except Exception as e:
+            logger.error("Ошибка при проверке URL в базе данных: %s", e)
+            return None
+
+    def record_sighting(self, story_url: str) -> datetime:
+        """Отмечает, что сюжет встретился в рубрике, и возвращает время первой встречи (UTC)"""
+        now = datetime.now(timezone.utc)
+        try:
+            clean_url = clean_story_url(story_url)
+
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                """
+                INSERT INTO story_sightings (story_url) VALUES (?)
+                ON CONFLICT(story_url) DO UPDATE SET
+                    last_seen_at = CURRENT_TIMESTAMP,
+                    times_seen = times_seen + 1
+            """,
+                (clean_url,),
+            )
+            row = conn.execute(
+                "SELECT first_seen_at FROM story_sightings WHERE story_url = ?",
+                (clean_url,),
+            ).fetchone()
+            conn.commit()
+            conn.close()
+
+            return datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc)
+
+        except Exception as e:
+            logger.error("Ошибка при сохранении в базу данных: %s", e)
+            return now
+
+    def mark_processed(
+        self,
+        story_url: str,
+        story_id: str,
+        title: str,
+        rubric: str,
+        text: str = "",
+        detail_links: Optional[int] = None,
+    ):
+        """Отмечает новость как обработанную в базе данных"""
+        try:
+            clean_url = clean_story_url(story_url)
+
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # Повторный проход сохраняет полный текст, если в прошлый раз его
+            # не было, и считает попытки, чтобы не обходить сюжет бесконечно
+            cursor.execute(
+                """
+                INSERT INTO processed_news
+                    (story_url, story_id, title, rubric, text, detail_links, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, STRFTIME('%Y-%m-%d %H:%M:%f', 'now'))
+                ON CONFLICT(story_url) DO UPDATE SET
+                    text = excluded.text,
+                    updated_at = excluded.updated_at,
+                    text_attempts = COALESCE(processed_news.text_attempts, 1) + 1,
+                    detail_links = COALESCE(
+                        excluded.detail_links, processed_news.detail_links
+                    )
+                WHERE COALESCE(processed_news.text, '') = ''
+            """,
+                (clean_url, story_id, title, rubric, text, detail_links),
+            )
+
+            conn.commit()
+            conn.close()
+
+            logger.debug("Новость отмечена как обработанная: %s", clean_url)
+
+        except Exception as e:
+            logger.error("Ошибка при сохранении в базу данных: %s", e)
+
+    def exists(self) -> bool:
+        """Есть ли файл базы (чтение не должно создавать пустую базу)"""
+        return Path(self.db_path).is_file()
+
+    def _connect_readonly(self) -> sqlite3.Connection:
+        # mode=ro не создает файл, если его нет
+        return sqlite3.connect(
+            f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True
+        )
+
+    def fetch_news(
+        self, rubric: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Возвращает обработанные новости, начиная с самых свежих"""
+        query = (
+            "SELECT story_id, story_url, title, rubric, text, processed_at "
+            "FROM processed_news"
+        )
+        params = []
+        if rubric:
+            query += " WHERE rubric = ?"
+            params.append(rubric)
+        query += " ORDER BY processed_at DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect_readonly()
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Сводка по базе: всего новостей, по рубрикам, первая и последняя"""
+        conn = self._connect_readonly()
+        try:
+            total, first, last = conn.execute(
+                "SELECT COUNT(*), MIN(processed_at), MAX(processed_at) FROM processed_news"
+            ).fetchone()
+            by_rubric = conn.execute(
+                "SELECT COALESCE(rubric, ''), COUNT(*) FROM processed_news "
+                "GROUP BY rubric ORDER BY COUNT(*) DESC"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {
+            "total": total,
+            "first_processed_at": first,
+            "last_processed_at": last,
+            "by_rubric": dict(by_rubric),
+        }
@@ -0,0 +1,171 @@
+"""
+Структурированное логирование: JSON, асинхронная запись через очередь,
+ротация файлов, сэмплирование частых сообщений и correlation ID
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import Config
+
+run_id_var: contextvars.ContextVar = contextvars.ContextVar("run_id", default=None)
+story_id_var: contextvars.ContextVar = contextvars.ContextVar("story_id", default=None)
+
+# Стандартные атрибуты LogRecord, которые не нужно дублировать в JSON
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_run_id() -> str:
+    """Создает и устанавливает correlation ID запуска"""
+    run_id = uuid.uuid4().hex[:12]
+    run_id_var.set(run_id)
+    return run_id
+
+
+class CorrelationFilter(logging.Filter):
+    """Добавляет run_id и story_id текущего контекста в запись"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = run_id_var.get()
+        record.story_id = story_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает каждое rate-е сообщение с ключом сэмплирования.
+
+    Частые сообщения уровня элемента помечаются extra={"sample": "ключ"};
+    первое сообщение с ключом всегда проходит, дальше 1 из rate.
+    Предупреждения и ошибки не сэмплируются.
+    """
+
+    def __init__(self, rate: int = 10):
+        super().__init__()
+        self.rate = max(1, rate)
+        self.counters: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        count = self.counters.get(key, 0)
+        self.counters[key] = count + 1
+        if count % self.rate:
+            return False
+        if count:
+            record.sampled = self.rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = record.stack_info
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, сохраняющий трассировку отдельно от сообщения.
+
+    Стандартный prepare() форматирует запись в потоке вызова, дописывает
+    трассировку в msg и очищает exc_info, так что JsonFormatter не видел
+    исключения. Здесь аргументы подставляются в msg, а трассировка остается
+    в exc_text: JSON получает ее в поле "exc", текстовый формат - как обычно.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Кадры трассировки не должны жить в очереди до записи в файл
+        record.exc_info = None
+        return record
+
+
+def _file_handler(path: str) -> logging.Handler:
+    if Config.LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path,
+            when=Config.LOG_ROTATE_WHEN,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+    return logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=Config.LOG_MAX_BYTES,
+        backupCount=Config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+
+
+def setup_logging(*log_files: str):
+    """
+    Настраивает логирование в консоль и в файлы из LOGS_DIR.
+
+    Обработчики работают в отдельном потоке QueueListener, а цикл событий
+    только кладет записи в очередь. Файлы пишутся в JSON (LOG_JSON=false
+    переключает на текстовый формат), консоль - в текстовом.
+    """
+    global _listener
+
+    Config.create_directories()
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, Config.LOG_LEVEL))
+
+    if _listener is not None:
+        # Повторная настройка: обновляем только уровень
+        return
+
+    text_formatter = logging.Formatter(Config.LOG_FORMAT)
+    file_formatter = JsonFormatter() if Config.LOG_JSON else text_formatter
+
+    handlers = []
+    for name in log_files:
+        handler = _file_handler(os.path.join(Config.LOGS_DIR, name))
+        handler.setFormatter(file_formatter)
+        handlers.append(handler)
+    console = logging.StreamHandler()
+    console.setFormatter(text_formatter)
+    handlers.append(console)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(Config.LOG_SAMPLE_RATE))
+    queue_handler.addFilter(CorrelationFilter())
+    root.handlers = [queue_handler]
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
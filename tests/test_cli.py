@@ -0,0 +1,21 @@
+"""
+Разбор аргументов командной строки
+"""
+import pytest
+
+from cli import build_parser
+
+
+@pytest.mark.parametrize("option", ["--sample-every", "--navigations"])
+@pytest.mark.parametrize("value", ["0", "-5"])
+def test_soak_rejects_non_positive_counts(option, value, capsys):
+    with pytest.raises(SystemExit) as error:
+        build_parser().parse_args(["soak", option, value])
+    assert error.value.code == 2
+    assert "должно быть положительным" in capsys.readouterr().err
+
+
+def test_soak_defaults():
+    args = build_parser().parse_args(["soak"])
+    assert args.navigations == 300
+    assert args.sample_every == 10
@@ -0,0 +1,114 @@
+"""
+Разбор и проверка конфигурации: профили, ошибки, перечитывание на ходу
+"""
+import pytest
+from dotenv import dotenv_values
+
+import config
+from config import LOAD_PROFILES, Config, ConfigError
+
+
+@pytest.fixture(autouse=True)
+def clean_config(monkeypatch):
+    """Окружение без настроек скрапера и восстановление Config после теста"""
+    saved = {name: getattr(Config, name) for name in Config._ENV_FIELDS}
+    for name in (*Config._ENV_FIELDS, "CONFIG_OVERRIDES_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    # .env из рабочей копии не должен влиять на тесты, файл переопределений читается
+    monkeypatch.setattr(
+        config, "dotenv_values", lambda path=None: dotenv_values(path) if path else {}
+    )
+    yield
+    for name, value in saved.items():
+        setattr(Config, name, value)
+
+
+def test_profile_sets_defaults_and_explicit_values_win(monkeypatch):
+    monkeypatch.setenv("LOAD_PROFILE", "Gentle")
+    monkeypatch.setenv("MIN_DELAY", "2.5")
+    Config.load()
+
+    assert Config.LOAD_PROFILE == "gentle"
+    assert Config.MAX_CONCURRENCY == LOAD_PROFILES["gentle"]["MAX_CONCURRENCY"]
+    assert Config.CONTEXT_POOL_SIZE == LOAD_PROFILES["gentle"]["CONTEXT_POOL_SIZE"]
+    assert Config.MIN_DELAY == 2.5
+    assert Config.MAX_DELAY == LOAD_PROFILES["gentle"]["MAX_DELAY"]
+
+
+def test_parsers(monkeypatch):
+    monkeypatch.setenv("SAVE_FORMAT", "both, parquet")
+    monkeypatch.setenv("RUBRIC_WEIGHTS", "Главное:1.0, Наука:0.8")
+    monkeypatch.setenv("HEADLESS", "off")
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    Config.load()
+
+    assert Config.SAVE_FORMAT == ["json", "rss", "parquet"]
+    assert Config.RUBRIC_WEIGHTS == {"Главное": 1.0, "Наука": 0.8}
+    assert Config.HEADLESS is False
+    assert Config.LOG_LEVEL == "DEBUG"
+
+
+def test_all_errors_are_reported_together(monkeypatch):
+    monkeypatch.setenv("LOAD_PROFILE", "turbo")
+    monkeypatch.setenv("MAX_ARTICLES", "много")
+    monkeypatch.setenv("PAGE_TIMEOUT", "0")
+    monkeypatch.setenv("SAVE_FORMAT", "xml")
+    monkeypatch.setenv("HEADLESS", "maybe")
+
+    with pytest.raises(ConfigError) as error:
+        Config.load()
+    message = str(error.value)
+    for name in (
+        "LOAD_PROFILE",
+        "MAX_ARTICLES",
+        "PAGE_TIMEOUT",
+        "SAVE_FORMAT",
+        "HEADLESS",
+    ):
+        assert name in message
+
+
+def test_concurrency_above_pool_size_is_rejected(monkeypatch):
+    monkeypatch.setenv("MAX_CONCURRENCY", "4")
+    monkeypatch.setenv("CONTEXT_POOL_SIZE", "2")
+    with pytest.raises(ConfigError, match="MAX_CONCURRENCY"):
+        Config.load()
+
+    # Профиль aggressive поднимает оба значения согласованно
+    monkeypatch.delenv("MAX_CONCURRENCY")
+    monkeypatch.delenv("CONTEXT_POOL_SIZE")
+    monkeypatch.setenv("LOAD_PROFILE", "aggressive")
+    Config.load()
+    assert Config.MAX_CONCURRENCY <= Config.CONTEXT_POOL_SIZE
+
+
+def test_reload_reports_changes_and_keeps_old_values_on_error(monkeypatch):
+    monkeypatch.setenv("MAX_ARTICLES", "30")
+    Config.load()
+
+    monkeypatch.setenv("MAX_ARTICLES", "50")
+    assert Config.reload() == {"MAX_ARTICLES": 50}
+    assert Config.reload() == {}
+
+    monkeypatch.setenv("MAX_ARTICLES", "70")
+    monkeypatch.setenv("MIN_DELAY", "-1")
+    with pytest.raises(ConfigError, match="MIN_DELAY"):
+        Config.reload()
+    assert Config.MAX_ARTICLES == 50
+    assert Config.MIN_DELAY == LOAD_PROFILES["normal"]["MIN_DELAY"]
+
+
+def test_overrides_file_wins_over_environment_and_is_reread(monkeypatch, tmp_path):
+    overrides = tmp_path / "scraper.env"
+    monkeypatch.setenv("CONFIG_OVERRIDES_FILE", str(overrides))
+    monkeypatch.setenv("MAX_ARTICLES", "30")
+    Config.load()
+    assert Config.MAX_ARTICLES == 30
+
+    overrides.write_text("MAX_ARTICLES=5\n", encoding="utf-8")
+    assert Config.reload() == {"MAX_ARTICLES": 5}
+
+    overrides.write_text("MAX_ARTICLES=0\n", encoding="utf-8")
+    with pytest.raises(ConfigError):
+        Config.reload()
+    assert Config.MAX_ARTICLES == 5
@@ -0,0 +1,92 @@
+"""
+Очередь сюжетов: приоритет, дедупликация, лимит на рубрику и дедлайн
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from frontier import CrawlFrontier
+
+NOW = datetime.now(timezone.utc)
+
+
+def _story(story_id, rubric="Главное"):
+    return {"id": story_id, "title": story_id, "rubric": rubric}
+
+
+def _drain(frontier):
+    stories = []
+    while (story := frontier.pop()) is not None:
+        stories.append(story)
+    return stories
+
+
+def test_higher_position_weight_and_freshness_come_first():
+    frontier = CrawlFrontier(rubric_weights={"Главное": 1.0})
+    frontier.push(_story("old", "Главное"), 0, NOW - timedelta(hours=48))
+    frontier.push(_story("fresh_top", "Главное"), 0, NOW)
+    frontier.push(_story("fresh_low", "Главное"), 9, NOW)
+    frontier.push(_story("other_rubric", "Спорт"), 0, NOW)
+
+    order = [story["id"] for story in _drain(frontier)]
+    assert order == ["fresh_top", "other_rubric", "fresh_low", "old"]
+
+
+def test_new_story_beats_retry_without_text():
+    frontier = CrawlFrontier()
+    frontier.push(_story("retry"), 0, NOW, is_new=False)
+    frontier.push(_story("new"), 0, NOW, is_new=True)
+    assert [story["id"] for story in _drain(frontier)] == ["new", "retry"]
+
+
+def test_story_seen_in_several_rubrics_is_queued_once_and_promoted():
+    frontier = CrawlFrontier()
+    frontier.push(_story("single"), 1, NOW)
+    frontier.push(_story("shared"), 3, NOW)
+    frontier.push(_story("shared", "Спорт"), 1, NOW)
+    frontier.push(_story("shared", "Наука"), 2, NOW)
+
+    assert len(frontier) == 2
+    stories = _drain(frontier)
+    assert [story["id"] for story in stories] == ["shared", "single"]
+    assert stories[0]["priority"] > stories[1]["priority"]
+
+
+def test_done_story_is_not_requeued():
+    frontier = CrawlFrontier()
+    frontier.push(_story("a"), 0, NOW)
+    assert frontier.pop()["id"] == "a"
+
+    frontier.push(_story("a", "Спорт"), 0, NOW)
+    assert frontier.pop() is None
+    assert len(frontier) == 0
+
+
+def test_max_per_rubric_skips_the_rest_of_a_rubric():
+    frontier = CrawlFrontier(max_per_rubric=2)
+    for i in range(4):
+        frontier.push(_story(f"main{i}"), i, NOW)
+    frontier.push(_story("sport0", "Спорт"), 5, NOW)
+
+    rubrics = [story["rubric"] for story in _drain(frontier)]
+    assert rubrics.count("Главное") == 2
+    assert "Спорт" in rubrics
+
+
+def test_deadline_stops_handing_out_work():
+    frontier = CrawlFrontier(deadline=time.monotonic() + 60)
+    frontier.push(_story("a"), 0, NOW)
+    frontier.push(_story("b"), 1, NOW)
+    assert frontier.pop()["id"] == "a"
+    assert not frontier.expired()
+
+    frontier.deadline = time.monotonic() - 1
+    assert frontier.expired()
+    assert frontier.time_left() < 0
+    assert frontier.pop() is None
+    assert len(frontier) == 1
+
+
+def test_no_deadline_never_expires():
+    frontier = CrawlFrontier()
+    assert frontier.time_left() is None
+    assert not frontier.expired()
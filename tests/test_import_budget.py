@@ -0,0 +1,79 @@
+"""
+Бюджет времени импорта: легкие команды CLI не должны тянуть браузер
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("playwright", "aiofiles", "pyarrow")
+CLI_IMPORT_BUDGET_MS = 100
+SCRAPER_IMPORT_BUDGET_MS = 500
+STATS_WALL_BUDGET_S = 2.0
+
+
+def _run(args, env=None, **kwargs):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        timeout=60,
+        **kwargs,
+    )
+
+
+def _import_time_ms(module: str) -> float:
+    """Накопленное время импорта модуля по -X importtime, мс"""
+    result = _run(["-X", "importtime", "-c", f"import {module}"])
+    assert result.returncode == 0, result.stderr
+    match = re.search(
+        rf"^import time:\s+\d+ \|\s+(\d+) \| {module}$", result.stderr, re.MULTILINE
+    )
+    assert match, result.stderr
+    return int(match.group(1)) / 1000
+
+
+def test_cli_import_budget():
+    assert _import_time_ms("cli") < CLI_IMPORT_BUDGET_MS
+
+
+def test_scraper_import_budget():
+    assert _import_time_ms("dzen_scraper") < SCRAPER_IMPORT_BUDGET_MS
+
+
+def test_scraper_import_skips_heavy_modules():
+    check = (
+        "import sys, dzen_scraper; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = _run(["-c", check])
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+def test_stats_wall_time(tmp_path):
+    env = {"OUTPUT_DIR": str(tmp_path), "LOGS_DIR": str(tmp_path / "logs")}
+    init = _run(
+        [
+            "-c",
+            "import sys; from storage import NewsDatabase; "
+            "NewsDatabase(sys.argv[1]).init()",
+            str(tmp_path / "news_database.db"),
+        ],
+        env=env,
+    )
+    assert init.returncode == 0, init.stderr
+
+    started = time.monotonic()
+    result = _run(["cli.py", "stats"], env=env)
+    elapsed = time.monotonic() - started
+
+    assert result.returncode == 0, result.stderr
+    assert "Всего новостей: 0" in result.stdout
+    assert elapsed < STATS_WALL_BUDGET_S
@@ -0,0 +1,118 @@
+"""
+Инкрементальный экспорт в Parquet: водяной знак updated_at и text_length
+"""
+import json
+import sqlite3
+import time
+
+import pytest
+
+from parquet_export import ParquetExporter
+from storage import ARTICLE_SEPARATOR, FULL_TEXTS_HEADER, NewsDatabase
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+
+STORY_URL = "https://dzen.ru/news/story/abc?utm=1"
+
+
+def _rows(exporter, dataset):
+    table = ds.dataset(
+        str(exporter.root / dataset), format="parquet", partitioning="hive"
+    ).to_table()
+    return table.to_pylist()
+
+
+def test_row_completed_after_export_is_exported_again(tmp_path):
+    db_path = str(tmp_path / "news_database.db")
+    db = NewsDatabase(db_path)
+    db.init()
+    exporter = ParquetExporter(str(tmp_path))
+
+    db.mark_processed(STORY_URL, "abc", "Сюжет", "Главное", "")
+    assert exporter.export_processed_news(db_path) == 1
+
+    # updated_at хранится с миллисекундами: дообход должен попасть позже знака
+    time.sleep(0.01)
+    db.mark_processed(STORY_URL, "abc", "Сюжет", "Главное", "полный текст")
+    assert exporter.export_processed_news(db_path) == 1
+    assert exporter.export_processed_news(db_path) == 0
+
+    lengths = sorted(row["text_length"] for row in _rows(exporter, "processed_news"))
+    assert lengths == [0, len("полный текст")]
+
+
+def test_legacy_last_id_state_is_honoured(tmp_path):
+    db_path = str(tmp_path / "news_database.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE processed_news (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_url TEXT UNIQUE NOT NULL,
+            story_id TEXT NOT NULL,
+            title TEXT,
+            rubric TEXT,
+            text TEXT,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO processed_news (story_url, story_id, title, rubric, text) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            ("https://dzen.ru/news/story/old", "old", "Старый", "Главное", ""),
+            ("https://dzen.ru/news/story/new", "new", "Новый", "Главное", "текст"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    exporter = ParquetExporter(str(tmp_path))
+    exporter.root.mkdir(parents=True)
+    exporter.state_path.write_text(
+        json.dumps({"runs": [], "processed_news_last_id": 1}), encoding="utf-8"
+    )
+
+    # Строка 1 уже выгружена старой версией, строка 2 - нет
+    assert exporter.export_processed_news(db_path) == 1
+    assert [row["story_id"] for row in _rows(exporter, "processed_news")] == ["new"]
+
+    NewsDatabase(db_path).mark_processed(
+        "https://dzen.ru/news/story/old", "old", "Старый", "Главное", "дообход"
+    )
+    assert exporter.export_processed_news(db_path) == 1
+    assert exporter.export_processed_news(db_path) == 0
+
+
+def test_missing_database_is_not_created(tmp_path):
+    db_path = tmp_path / "news_database.db"
+    assert ParquetExporter(str(tmp_path)).export_processed_news(str(db_path)) == 0
+    assert not db_path.exists()
+
+
+def test_story_text_length_counts_article_texts_only(tmp_path):
+    texts = ["первая статья", "вторая статья"]
+    items = [
+        {
+            "id": "ok",
+            "title": "С текстом",
+            "rubric": "Главное",
+            "summary": f"\n\n\n\n{FULL_TEXTS_HEADER}\n\n"
+            + ARTICLE_SEPARATOR.join(texts),
+            "scraped_at": "2026-01-15T11:00:00",
+        },
+        {
+            "id": "failed",
+            "title": "Без текста",
+            "rubric": "Главное",
+            "summary": "Контент недоступен (timeout)",
+            "scraped_at": "2026-01-15T11:00:00",
+        },
+    ]
+    exporter = ParquetExporter(str(tmp_path))
+    assert exporter.export_run(items, "20260115_110000") == 2
+
+    lengths = {
+        row["story_id"]: row["text_length"] for row in _rows(exporter, "stories")
+    }
+    assert lengths == {"ok": len(ARTICLE_SEPARATOR.join(texts)), "failed": 0}
@@ -0,0 +1,150 @@
+"""
+AIMD-ограничитель: рост и снижение скорости, пауза после блокировки,
+освобождение слотов и детектор капчи
+"""
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import AdaptiveRateLimiter, is_challenge_page
+
+URL = "https://dzen.ru/news/story/abc"
+
+
+def _limiter(**kwargs):
+    options = dict(
+        min_delay=0.0, initial_delay=1.0, max_concurrency=4.0, block_cooldown=30.0
+    )
+    options.update(kwargs)
+    return AdaptiveRateLimiter(**options)
+
+
+def _state(limiter):
+    return limiter.hosts["dzen.ru"]
+
+
+def test_healthy_responses_increase_additively():
+    limiter = _limiter(min_delay=0.5)
+    for _ in range(3):
+        limiter.record(URL, latency=0.5, status=200)
+
+    state = _state(limiter)
+    # 1 -> 2 -> 2.5 -> 2.9: прирост 1/concurrency за ответ
+    assert state.concurrency == pytest.approx(1 + 1 + 1 / 2 + 1 / 2.5)
+    assert state.interval == pytest.approx(1.0 * 0.9**3)
+    assert state.successes == 3
+
+    for _ in range(100):
+        limiter.record(URL, latency=0.5, status=200)
+    assert state.concurrency == 4.0
+    assert state.interval == 0.5
+
+
+def test_block_decreases_multiplicatively_and_cools_down():
+    limiter = _limiter()
+    for _ in range(20):
+        limiter.record(URL, latency=0.5, status=200)
+    before = _state(limiter).interval
+
+    limiter.record(URL, latency=0.5, status=429, blocked=True)
+    state = _state(limiter)
+    assert state.concurrency == 2.0
+    assert state.interval == pytest.approx(before * 2)
+    assert state.cooldown_until > time.monotonic() + 25
+    assert state.blocks == 1
+
+
+def test_slow_or_failing_responses_back_off_gently():
+    limiter = _limiter(target_latency=5.0)
+    limiter.record(URL, latency=0.5, status=200)
+    limiter.record(URL, latency=0.5, status=200)
+    concurrency = _state(limiter).concurrency
+
+    limiter.record(URL, latency=9.0, status=200)
+    limiter.record(URL, latency=0.5, status=503)
+    state = _state(limiter)
+    assert state.concurrency == pytest.approx(max(1.0, concurrency * 0.75 * 0.75))
+    assert state.slowdowns == 2
+    assert state.cooldown_until == 0.0
+
+
+def test_cooldown_delays_the_next_request():
+    async def scenario():
+        limiter = _limiter(initial_delay=0.0, block_cooldown=0.3, jitter=0.0)
+        limiter.record(URL, latency=0.1, status=403, blocked=True)
+        started = time.monotonic()
+        async with limiter.slot(URL):
+            pass
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.25
+
+
+def test_concurrency_limits_requests_in_flight():
+    async def scenario():
+        limiter = _limiter(initial_delay=0.0, jitter=0.0)
+        in_flight = []
+
+        async def request():
+            async with limiter.slot(URL):
+                in_flight.append(_state(limiter).in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(5)))
+        return in_flight, _state(limiter).in_flight
+
+    in_flight, left = asyncio.run(scenario())
+    assert max(in_flight) == 1
+    assert left == 0
+
+
+def test_cancel_while_waiting_for_interval_frees_the_slot():
+    async def scenario():
+        limiter = _limiter(initial_delay=10.0, jitter=0.0)
+        async with limiter.slot(URL):
+            pass
+
+        # Второй запрос занимает слот и ждет интервал; отмена не должна его унести
+        waiting = asyncio.create_task(limiter.acquire(URL))
+        await asyncio.sleep(0.05)
+        assert _state(limiter).in_flight == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return _state(limiter).in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_measured_rate_counts_recent_requests():
+    async def scenario():
+        limiter = _limiter(initial_delay=0.0, jitter=0.0)
+        for _ in range(5):
+            async with limiter.slot(URL):
+                pass
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.metrics()["dzen.ru"]["in_flight"] == 0
+    assert limiter.current_rate(URL) > 0
+    assert limiter.current_rate("https://example.com/") == 0.0
+
+
+@pytest.mark.parametrize(
+    "status, url, text",
+    [
+        (429, URL, ""),
+        (403, URL, ""),
+        (200, "https://dzen.ru/showcaptcha?retpath=x", ""),
+        (200, URL, "Вы не робот? Подтвердите, что запросы отправляли вы"),
+        (200, URL, "SmartCaptcha by Yandex Cloud"),
+    ],
+)
+def test_challenge_pages_are_detected(status, url, text):
+    assert is_challenge_page(status, url, text)
+
+
+def test_regular_page_is_not_a_challenge():
+    assert not is_challenge_page(200, URL, "Главные новости дня. Курс рубля")
+    assert not is_challenge_page(None, URL)
@@ -0,0 +1,141 @@
+"""
+Порядок цепочек, восстановление селекторов и алерты движка селекторов
+"""
+import asyncio
+import json
+import logging
+
+from selector_engine import SelectorEngine
+
+PRIMARY = '[data-testid="other-cards"] [data-testid="card-link"]'
+BROAD = '[data-testid="card-link"]'
+ANY_STORY = 'a[href*="/news/story/"]'
+CHAINS = {"news_cards": [PRIMARY, BROAD, ANY_STORY]}
+
+
+class FakeScope:
+    """Страница, на которой найдены только элементы из matches"""
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.waited = []
+
+    async def query_selector_all(self, selector):
+        return list(self.matches.get(selector, []))
+
+    async def query_selector(self, selector):
+        found = self.matches.get(selector, [])
+        return found[0] if found else None
+
+    async def wait_for_selector(self, selector, timeout):
+        self.waited.append(selector.split(", "))
+        if not any(self.matches.get(s) for s in selector.split(", ")):
+            raise TimeoutError(selector)
+
+
+def _page(primary=True):
+    """Страница рубрики: широкие селекторы находят надмножество основного"""
+    cards = ["card1", "card2"]
+    matches = {BROAD: cards + ["promo"], ANY_STORY: cards + ["promo", "footer"]}
+    if primary:
+        matches[PRIMARY] = cards
+    return FakeScope(matches)
+
+
+def _lookup(engine, scope, field="news_cards"):
+    return asyncio.run(engine.query_all(scope, field))
+
+
+def test_single_miss_keeps_config_order():
+    engine = SelectorEngine(CHAINS)
+    assert _lookup(engine, _page(primary=False)) == ["card1", "card2", "promo"]
+
+    for _ in range(100):
+        assert _lookup(engine, _page()) == ["card1", "card2"]
+    assert engine.ordered("news_cards")[0] == PRIMARY
+    assert engine.selector_stats["news_cards"][PRIMARY]["hits"] == 100
+
+
+def test_dead_selector_is_demoted_and_recovers():
+    engine = SelectorEngine(CHAINS, probe_every=5)
+    for _ in range(10):
+        _lookup(engine, _page(primary=False))
+    assert engine.ordered("news_cards") == [BROAD, ANY_STORY, PRIMARY]
+
+    # Верстка вернулась: перепроверки в порядке конфига возвращают основной
+    for _ in range(15):
+        _lookup(engine, _page())
+    assert engine.ordered("news_cards")[0] == PRIMARY
+    assert _lookup(engine, _page()) == ["card1", "card2"]
+
+
+def test_first_lookup_of_run_probes_config_order(tmp_path):
+    stats_path = tmp_path / "selector_stats.json"
+    stats_path.write_text(
+        json.dumps(
+            {
+                "selectors": {
+                    "news_cards": {PRIMARY: {"score": 0.1, "hits": 0, "misses": 9}}
+                },
+                "fields": {},
+            }
+        ),
+        encoding="utf-8",
+    )
+    engine = SelectorEngine(CHAINS, stats_path=str(stats_path))
+    assert engine.ordered("news_cards")[0] == BROAD
+
+    assert _lookup(engine, _page()) == ["card1", "card2"]
+    assert engine.selector_stats["news_cards"][PRIMARY]["hits"] == 1
+
+
+def test_wait_for_ignores_selectors_below_current():
+    engine = SelectorEngine(CHAINS)
+    scope = _page(primary=False)
+
+    assert not asyncio.run(engine.wait_for(scope, "news_cards", 100))
+    assert scope.waited == [[PRIMARY]]
+    assert engine.selector_stats["news_cards"][PRIMARY]["misses"] == 1
+
+    for _ in range(10):
+        asyncio.run(engine.wait_for(scope, "news_cards", 100))
+    assert engine.ordered("news_cards")[0] == BROAD
+    assert asyncio.run(engine.wait_for(scope, "news_cards", 100))
+    assert scope.waited[-1] == [PRIMARY, BROAD]
+
+
+def test_readiness_wait_does_not_touch_stats():
+    engine = SelectorEngine(CHAINS)
+    assert not asyncio.run(
+        engine.wait_for(_page(primary=False), "news_cards", 100, record=False)
+    )
+    assert engine.selector_stats == {}
+    assert engine.field_stats == {}
+
+
+def test_alert_fires_once_and_clears(caplog):
+    engine = SelectorEngine(CHAINS, min_samples=3)
+    empty = FakeScope({})
+    with caplog.at_level(logging.INFO, logger="selector_engine"):
+        for _ in range(10):
+            _lookup(engine, empty)
+        for _ in range(10):
+            _lookup(engine, _page())
+
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert "news_cards" in errors[0].getMessage()
+    assert any("снова находят" in r.getMessage() for r in caplog.records)
+    assert not engine.field_stats["news_cards"]["alerted"]
+
+
+def test_optional_fields_never_alert(caplog):
+    engine = SelectorEngine(
+        {"summary_text": ["span.text"]}, min_samples=1, optional_fields=["summary_text"]
+    )
+    with caplog.at_level(logging.ERROR, logger="selector_engine"):
+        for _ in range(10):
+            asyncio.run(engine.query(FakeScope({}), "summary_text"))
+    assert not caplog.records
+    assert "summary_text" not in engine.field_stats
+    assert engine.health()["summary_text"]["optional"]
@@ -0,0 +1,83 @@
+"""
+JSON-логи через очередь: исключения, correlation ID и сэмплирование
+"""
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from structured_logging import (
+    CorrelationFilter,
+    JsonFormatter,
+    SamplingFilter,
+    StructuredQueueHandler,
+    story_id_var,
+)
+
+
+@pytest.fixture
+def json_log():
+    """Логгер, пишущий через очередь в JSON; возвращает логгер и функцию чтения"""
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(rate=3))
+    handler.addFilter(CorrelationFilter())
+    listener = logging.handlers.QueueListener(log_queue, target)
+    listener.start()
+
+    log = logging.getLogger("tests.structured_logging")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.addHandler(handler)
+
+    def lines():
+        # Останавливаем слушатель, чтобы дождаться записи всех сообщений
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield log, lines
+    log.removeHandler(handler)
+
+
+def test_exception_keeps_message_and_traceback_apart(json_log):
+    log, lines = json_log
+    try:
+        raise ValueError("сломалось")
+    except ValueError:
+        log.exception("Ошибка при обработке %s", "сюжета")
+
+    (line,) = lines()
+    assert line["msg"] == "Ошибка при обработке сюжета"
+    assert "Traceback" in line["exc"]
+    assert "ValueError: сломалось" in line["exc"]
+
+
+def test_story_id_is_attached(json_log):
+    log, lines = json_log
+    token = story_id_var.set("abc123")
+    try:
+        log.info("Сбор контента")
+    finally:
+        story_id_var.reset(token)
+    log.info("Вне сюжета")
+
+    first, second = lines()
+    assert first["story_id"] == "abc123"
+    assert "story_id" not in second
+
+
+def test_sampled_messages_pass_one_in_rate(json_log):
+    log, lines = json_log
+    for i in range(7):
+        log.info("Карточка %s", i, extra={"sample": "card"})
+    log.warning("Предупреждение", extra={"sample": "card"})
+
+    messages = [line["msg"] for line in lines()]
+    assert messages == ["Карточка 0", "Карточка 3", "Карточка 6", "Предупреждение"]